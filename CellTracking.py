@@ -1,13 +1,9 @@
 import numpy as np
 import math
-from cellpose import utils as utilscp
-import matplotlib.pyplot as plt
-import re
 import matplotlib as mtp
-from matplotlib import cm
 import itertools
-import random
 from scipy.spatial import cKDTree
+from scipy.optimize import linear_sum_assignment
 from copy import deepcopy, copy
 from matplotlib.widgets import Slider
 from matplotlib.transforms import TransformedPatchPath
@@ -17,9 +13,13 @@ import warnings
 from matplotlib.lines import Line2D
 from matplotlib.lines import lineStyles
 from matplotlib.ticker import MaxNLocator
+from matplotlib.colors import to_rgba_array
+from numba import njit, prange
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 warnings.filterwarnings("ignore", category=np.VisibleDeprecationWarning) 
-plt.rcParams['keymap.save'].remove('s')
-plt.rcParams['keymap.zoom'][0]='º'
+mtp.rcParams['keymap.save'].remove('s')
+mtp.rcParams['keymap.zoom'][0]='º'
 
 PLTLINESTYLES = list(lineStyles.keys())
 PLTMARKERS = ["", ".", "o", "d", "s", "P", "*", "X" ,"p","^"]
@@ -27,6 +27,244 @@ PLTMARKERS = ["", ".", "o", "d", "s", "P", "*", "X" ,"p","^"]
 LINE_UP = '\033[1A'
 LINE_CLEAR = '\x1b[2K'
 
+# Number of z-levels segmented by cellpose at once
+CELLPOSE_BATCH = 8
+
+@njit(cache=True)
+def _scanline_bounds(hull):
+    # Minimum and maximum x of the outline at each row, starting from its lowest row ymin.
+    ymin = hull[0,1]
+    ymax = hull[0,1]
+    for k in range(hull.shape[0]):
+        ymin = min(ymin, hull[k,1])
+        ymax = max(ymax, hull[k,1])
+    nrows  = ymax - ymin + 1
+    minx   = np.zeros(nrows, dtype=np.int64)
+    maxx   = np.zeros(nrows, dtype=np.int64)
+    filled = np.zeros(nrows, dtype=np.bool_)
+    for k in range(hull.shape[0]):
+        r = hull[k,1] - ymin
+        x = hull[k,0]
+        if filled[r]:
+            minx[r] = min(minx[r], x)
+            maxx[r] = max(maxx[r], x)
+        else:
+            minx[r] = x
+            maxx[r] = x
+            filled[r] = True
+    return ymin, minx, maxx, filled
+
+@njit(cache=True)
+def _hull_area(hull):
+    # Number of points filled by the scanline. The last row of the outline is left as boundary.
+    if hull.shape[0]==0:
+        return 0
+    ymin, minx, maxx, filled = _scanline_bounds(hull)
+    n = 0
+    for r in range(len(filled)-1):
+        if filled[r]:
+            n += maxx[r] - minx[r] + 1
+    return n
+
+@njit(cache=True)
+def _fill_hull(hull, out):
+    # Write the (x, y) points filled by the scanline into out, row by row.
+    if hull.shape[0]==0:
+        return
+    ymin, minx, maxx, filled = _scanline_bounds(hull)
+    k = 0
+    for r in range(len(filled)-1):
+        if filled[r]:
+            for x in range(minx[r], maxx[r]+1):
+                out[k,0] = x
+                out[k,1] = ymin + r
+                k += 1
+
+@njit(nogil=True, cache=True)
+def _rasterize_outlines(outlines, offsets):
+    # Scanline fill of all the outlines, stored one after the other in outlines.
+    # The points of outline c are returned in points[starts[c]:starts[c+1]], as int32 (x, y) rows.
+    ncells = len(offsets) - 1
+    counts = np.zeros(ncells, dtype=np.int64)
+    for c in range(ncells):
+        counts[c] = _hull_area(outlines[offsets[c]:offsets[c+1]])
+    starts = np.zeros(ncells+1, dtype=np.int64)
+    for c in range(ncells):
+        starts[c+1] = starts[c] + counts[c]
+    points = np.empty((starts[ncells], 2), dtype=np.int32)
+    for c in range(ncells):
+        _fill_hull(outlines[offsets[c]:offsets[c+1]], points[starts[c]:starts[c+1]])
+    return points, starts
+
+def points_within_hulls(hulls):
+    # Compute the points contained within each of the hulls or outlines.
+    # Every row y of an outline is filled between its minimum and maximum x.
+    if len(hulls)==0:
+        return []
+    offsets = np.zeros(len(hulls)+1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(hull) for hull in hulls])
+    outlines = np.ascontiguousarray(np.concatenate(hulls), dtype=np.int64)
+    points, starts = _rasterize_outlines(outlines, offsets)
+    return [points[starts[c]:starts[c+1]] for c in range(len(hulls))]
+
+def points_within_hull(hull):
+    return points_within_hulls([hull])[0]
+
+def increase_point_resolution(outline, min_outline_length):
+    rounds = np.ceil(np.log2(min_outline_length/len(outline))).astype('int32')
+    newoutline_new = np.copy(outline)
+    for r in range(rounds):
+        pre_outline = newoutline_new
+        # Interleave the outline points with the midpoints of consecutive points
+        n = len(pre_outline)
+        newoutline_new = np.empty((2*n, 2), dtype=pre_outline.dtype)
+        newoutline_new[0::2] = pre_outline
+        newoutline_new[1::2] = np.rint((pre_outline + np.roll(pre_outline, -1, axis=0))/2).astype('int32')
+        # The midpoint between the last and first points goes first
+        newoutline_new = np.roll(newoutline_new, 1, axis=0)
+
+    return newoutline_new
+
+def _postprocess_slice(masks, min_outline_length):
+    # Outlines and masks of the cells of a z-level segmented by cellpose.
+    # It only works on its arguments so that z-levels can be post-processed in threads.
+    from cellpose import utils as utilscp
+    
+    # Extract the oulines from the masks using the cellpose function for it. 
+    outlines = utilscp.outlines_list(masks)
+
+    outlines = [increase_point_resolution(outline, min_outline_length) for outline in outlines]
+
+    # Compute the masks of all the cells in the current z-level at once
+    masks = points_within_hulls(outlines)
+
+    # We now check which oulines do we keep and which we remove: cells with empty masks are removed.
+    keep = [len(mask)>0 for mask in masks]
+    return list(itertools.compress(outlines, keep)), list(itertools.compress(masks, keep))
+
+@njit(cache=True, error_model="numpy")
+def _merge_cell_barriers(intensity, valleys, peaks, th, min_sep=5):
+    # Merge the cell barriers closer than min_sep planes into the maximum of the intensity
+    # between them, flattening the intensity there, until no barriers are that close.
+    # Then drop the barriers whose valley is not deep enough relative to its closest peaks.
+    # intensity is modified in place. peaks have to be sorted.
+    n = len(valleys)
+    cbs    = np.empty(n, dtype=np.int32)
+    added  = np.empty(n, dtype=np.int32)
+    popped = np.zeros(n, dtype=np.bool_)
+    for i in range(n):
+        cbs[i] = valleys[i]
+    keep_checking = True
+    while keep_checking:
+        keep_checking = False
+        nadd = 0
+        for i in range(n):
+            popped[i] = False
+        for i in range(n-1):
+            a = cbs[i]
+            b = cbs[i+1]
+            if b - a < min_sep:
+                popped[i]   = True
+                popped[i+1] = True
+                new_cb = a
+                for k in range(a+1, b):
+                    if intensity[k] > intensity[new_cb]:
+                        new_cb = k
+                inten_new_cb = intensity[new_cb]
+                for k in range(a, b+1):
+                    intensity[k] = inten_new_cb
+                added[nadd] = new_cb
+                nadd += 1
+                keep_checking = True
+        # Kept barriers are written to the front, followed by the merged ones
+        m = 0
+        for i in range(n):
+            if not popped[i]:
+                cbs[m] = cbs[i]
+                m += 1
+        for i in range(nadd):
+            cbs[m] = added[i]
+            m += 1
+        n = m
+        cbs[:n].sort()
+
+    m = 0
+    for i in range(n):
+        cb = cbs[i]
+        closest_peak_left_idx  = -1
+        closest_peak_right_idx = -1
+        for p in peaks:
+            if p < cb:
+                closest_peak_left_idx = p
+            elif p > cb:
+                closest_peak_right_idx = p
+                break
+        # A barrier needs a peak at each side
+        if closest_peak_left_idx==-1 or closest_peak_right_idx==-1:
+            continue
+        inten_peak = min(intensity[closest_peak_left_idx], intensity[closest_peak_right_idx])
+        if (inten_peak - intensity[cb])/inten_peak < th: #0.2 threshold of relative height of the valley to the peak
+            continue
+        cbs[m] = cb
+        m += 1
+    return cbs[:m]
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _gated_dist(prev, curr, zth, dth, big, Dists):
+    # Distance in xy between every past and future (z, y, x) center, written directly into Dists.
+    # Disallowed pairs, more than zth planes apart or at a distance of dth or more, get the cost big.
+    # big has to exceed dth*min(N, M) so that the assignment never trades a valid match for a disallowed one.
+    N = prev.shape[0]
+    M = curr.shape[0]
+    for i in prange(N):
+        for j in range(M):
+            if abs(prev[i,0] - curr[j,0]) > zth:
+                Dists[i,j] = big
+            else:
+                dy = prev[i,1] - curr[j,1]
+                dx = prev[i,2] - curr[j,2]
+                d  = np.sqrt(dy*dy + dx*dx)
+                if d >= dth:
+                    Dists[i,j] = big
+                else:
+                    Dists[i,j] = d
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(words):
+        return int(np.bitwise_count(words).sum())
+else:
+    _POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    def _popcount(words):
+        return int(_POPCOUNT_TABLE[words.view(np.uint8)].sum())
+
+def mask_bitmap(mask):
+    # Pack a mask into 64 pixel words aligned with the image columns, covering its bounding box.
+    # Returns (first row, first word, packed words of shape (rows, words), number of pixels).
+    xs = mask[:,0]
+    ys = mask[:,1]
+    y0 = ys.min()
+    w0 = xs.min()//64
+    nrows  = ys.max() - y0 + 1
+    nwords = xs.max()//64 - w0 + 1
+    bits = np.zeros((nrows, nwords*64), dtype=bool)
+    bits[ys-y0, xs-w0*64] = True
+    packed = np.packbits(bits, axis=1, bitorder='little').view(np.uint64)
+    return y0, w0, packed, len(mask)
+
+def bitmaps_intersection_size(b1, b2):
+    # Number of common pixels of two masks packed with mask_bitmap.
+    # Words are aligned on the image, so only the common rows and words need to be compared.
+    y1, w1, p1, _ = b1
+    y2, w2, p2, _ = b2
+    ys = max(y1, y2)
+    ye = min(y1+p1.shape[0], y2+p2.shape[0])
+    ws = max(w1, w2)
+    we = min(w1+p1.shape[1], w2+p2.shape[1])
+    if ye<=ys or we<=ws:
+        return 0
+    inter = np.bitwise_and(p1[ys-y1:ye-y1, ws-w1:we-w1], p2[ys-y2:ye-y2, ws-w2:we-w2])
+    return _popcount(inter)
+
 # This class segments the cell of an embryo in a given time. The input data should be of shape (z, x or y, x or y)
 class MySlider(Slider):
     """My version of the slider."""
@@ -43,6 +281,7 @@ class MySlider(Slider):
 class CellSegmentation(object):
 
     def __init__(self, stack, model, embcode, trainedmodel=None, channels=[0,0], flow_th_cellpose=0.4, distance_th_z=3.0, xyresolution=0.2767553, relative_overlap=False, use_full_matrix_to_compute_overlap=True, z_neighborhood=2, overlap_gradient_th=0.3, plot_masks=True, masks_cmap='tab10', min_outline_length=150, neighbors_for_sequence_sorting=7):
+        from matplotlib import cm
         self.embcode             = embcode
         self.stack               = stack
         self._model              = model
@@ -63,6 +302,13 @@ class CellSegmentation(object):
         self._masks_colors       = self._masks_cmap.colors
         self._min_outline_length = min_outline_length
         self._nearest_neighs     = neighbors_for_sequence_sorting
+        self._label_per_z_dirty  = True
+        self._axis_artists       = {}
+        self.pltmasks_bool       = plot_masks
+        self._mask_rgba_cache    = {}
+        # Bumped whenever the masks or their labels change
+        self._masks_version      = 0
+        self._masks_cache_ver    = None
         self._assign_color_to_label()
 
     def __call__(self):
@@ -71,9 +317,20 @@ class CellSegmentation(object):
         self._cell_segmentation_outlines()
         self.printfancy("")
         self.printfancy("Raw segmentation completed")
+        self.printfancy("Running segmentation post-processing...")
+        self._segmentation_postprocessing()
+                
+        self.printfancy("")
+
+        self.printfancy("Segmentation completed and revised")
+        self.printfancy("")
+        print("################         SEGMENTATION COMPLETED       ################")
+        self.printfancy("")
+    
+    def _segmentation_postprocessing(self):
+        # Everything after cellpose. It does not print, so that it can run while the next stack is segmented.
         self._update()
 
-        self.printfancy("Running segmentation post-processing...")
         self._separate_concatenated_cells()
         self._update()
 
@@ -83,227 +340,214 @@ class CellSegmentation(object):
         self._remove_short_cells()
         self._update()
         self._position3d()
-                
-        self.printfancy("")
 
-        self.printfancy("Segmentation completed and revised")
-        self.printfancy("")
-        print("################         SEGMENTATION COMPLETED       ################")
-        self.printfancy("")
-    
     def _cell_segmentation_outlines(self):
 
         # This function will return the Outlines and Mask of the current embryo. 
         # The structure will be (z, cell_number)
-        self.Outlines = []
-        self.Masks    = []
+        self.Outlines = [None]*self.slices
+        self.Masks    = [None]*self.slices
 
         # Number of z-levels
         self.printfancy("Progress: ")
-        # Loop over the z-levels
-        for z in range(self.slices):
-            self.progress(z+1, self.slices)
-            # Current xy plane
-            img = self.stack[z,:,:]
-
-            # Select whether we are using a pre-trained model or a cellpose base-model
-            if self._trainedmodel:
-                masks, flows, styles = self._model.eval(img)
-            else:
-                masks, flows, styles, diam = self._model.eval(img, channels=self._channels, flow_threshold=self._flow_th_cellpose)
-            
-            # Extract the oulines from the masks using the cellpose function for it. 
-            outlines = utilscp.outlines_list(masks)
-
-            # Append the empty masks list for the current z-level.
-            self.Masks.append([])
-
-            # We now check which oulines do we keep and which we remove.
-            idxtoremove = []
-            for cell, outline in enumerate(outlines):
-                outlines[cell] = self._increase_point_resolution(outline)
-
-                # Compute cell mask
-                ptsin = self._points_within_hull(outlines[cell])
-
-                # Check for empty masks and keep the corresponding cell index. 
-                if len(ptsin)==0:
-                    idxtoremove.append(cell)
-
-                # Store the mask otherwise
+        # Cellpose runs on batches of z-levels. While it segments the next batch, 
+        # the outlines and masks of the previous z-levels are computed in other threads.
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            futures = {}
+            for z0 in range(0, self.slices, CELLPOSE_BATCH):
+                imgs = list(self.stack[z0:z0+CELLPOSE_BATCH])
+
+                # Select whether we are using a pre-trained model or a cellpose base-model
+                if self._trainedmodel:
+                    masks_z, flows, styles = self._model.eval(imgs)
                 else:
-                    self.Masks[z].append(ptsin)
+                    masks_z, flows, styles, diam = self._model.eval(imgs, channels=self._channels, flow_threshold=self._flow_th_cellpose)
 
-            # Remove the outlines for the masks
-            for idrem in idxtoremove:
-                outlines.pop(idrem)
-
-            # Keep the ouline for the current z-level
-            self.Outlines.append(outlines)
+                for dz, masks in enumerate(masks_z):
+                    futures[executor.submit(_postprocess_slice, masks, self._min_outline_length)] = z0+dz
+            
+            # Keep the masks and ouline of each z-level as they are completed
+            for done, future in enumerate(as_completed(futures)):
+                z = futures[future]
+                self.Outlines[z], self.Masks[z] = future.result()
+                self.progress(done+1, self.slices)
+
+    def _flatten_masks(self):
+        # Flat (Structure of Arrays) version of Masks. The pixels of all cells are stored
+        # contiguously in _masks_xy, cell after cell and z after z. Cells get a global id
+        # in that same order; the cells of plane z are _cells_offsets[z]:_cells_offsets[z+1].
+        ncells_z = [len(masks) for masks in self.Masks]
+        self._cells_offsets = np.zeros(self.slices+1, dtype=np.int64)
+        self._cells_offsets[1:] = np.cumsum(ncells_z)
+        ncells = self._cells_offsets[-1]
+
+        masks = [mask for masks_z in self.Masks for mask in masks_z]
+        self._masks_lengths = np.array([len(mask) for mask in masks], dtype=np.int64)
+        self._masks_offsets = np.cumsum(self._masks_lengths) - self._masks_lengths
+        if ncells==0:
+            self._masks_xy = np.empty((0,2), dtype=np.int32)
+        else:
+            self._masks_xy = np.concatenate(masks).astype(np.int32, copy=False)
+        self._masks_cellid = np.repeat(np.arange(ncells), self._masks_lengths)
+        self._masks_z      = np.repeat(np.repeat(np.arange(self.slices), ncells_z), self._masks_lengths)
 
-    def _points_within_hull(self, hull):
-        # With this function we compute the points contained within a hull or outline.
-        pointsinside=[]
-        sortidx = np.argsort(hull[:,1])
-        outx = hull[:,0][sortidx]
-        outy = hull[:,1][sortidx]
-        curry = outy[0]
-        minx = np.iinfo(np.int32).max
-        maxx = 0
-        for j,y in enumerate(outy):
-            done=False
-            while not done:
-                if y==curry:
-                    minx = np.minimum(minx, outx[j])
-                    maxx = np.maximum(maxx, outx[j])
-                    done=True
-                    curry=y
-                else:
-                    for x in range(minx, maxx+1):
-                        pointsinside.append([x, curry])
-                    minx = np.iinfo(np.int32).max
-                    maxx = 0
-                    curry= y
-
-        pointsinside=np.array(pointsinside)
-        return pointsinside
-    
     def _extract_cell_centers(self):
         # Function for extracting the cell centers for the masks of a given embryo. 
         # It is extracted computing the positional centroid weighted with the intensisty of each point. 
         # It returns list of similar shape as Outlines and Masks. 
-        self.centersi = []
-        self.centersj = []
-
-        # Loop over each z-level
-        for z, outlines in enumerate(self.Outlines):
-
-            # Current xy plane with the intensity of fluorescence 
-            img = self.stack[z,:,:]
-
-            # Append an empty list for the current z-level. We will push here the i and j coordinates of each cell. 
-            self.centersi.append([])
-            self.centersj.append([])
+        self._flatten_masks()
+        ncells = self._cells_offsets[-1]
+        xs = self._masks_xy[:,0]
+        ys = self._masks_xy[:,1]
+
+        # Intensity of fluorescence of every mask pixel
+        weights = self.stack[self._masks_z, ys, xs].astype(np.float64)
+
+        # Weighted sums of the coordinates for every cell. The pixels of each cell are
+        # contiguous, so a segmented reduction over the mask offsets does it in one pass.
+        if ncells==0:
+            sumw = sumi = sumj = np.zeros(0)
+        else:
+            sumw = np.add.reduceat(weights, self._masks_offsets)
+            sumi = np.add.reduceat(weights*ys, self._masks_offsets)
+            sumj = np.add.reduceat(weights*xs, self._masks_offsets)
 
-            # Loop over all the cells detected in this level
-            for cell, outline in enumerate(outlines):
+        # Total intensity of every cell, per z. Reused by _nuclear_intensity_cell_z and _position3d
+        self._cell_sums = np.split(sumw, self._cells_offsets[1:-1])
 
-                # x and y coordinates of the centroid.
-                xs = np.average(self.Masks[z][cell][:,1], weights=img[self.Masks[z][cell][:,1], self.Masks[z][cell][:,0]])
-                ys = np.average(self.Masks[z][cell][:,0], weights=img[self.Masks[z][cell][:,1], self.Masks[z][cell][:,0]])
-                self.centersi[z].append(xs)
-                self.centersj[z].append(ys)
+        # x and y coordinates of the centroids, with shape (cell, 2)
+        self._centers = np.column_stack([sumi/sumw, sumj/sumw])
+        self.centersi = [c.tolist() for c in np.split(self._centers[:,0], self._cells_offsets[1:-1])]
+        self.centersj = [c.tolist() for c in np.split(self._centers[:,1], self._cells_offsets[1:-1])]
 
     def _compute_distances_with_pre_post_z(self):
         self._distances_idx = []
         self._distances_val = []
         distance_th = np.round(self._distance_th_z/self._xyresolution)
+
+        # One tree per z-plane with the cell centers of that plane
+        points = [np.column_stack([self.centersi[z], self.centersj[z]]) for z in range(self.slices)]
+        trees  = [cKDTree(pts) if len(pts)>0 else None for pts in points]
         for z in range(self.slices):
             self._distances_idx.append([])
             self._distances_val.append([])
-            for cell in range(len(self.centersi[z])):
-                self._distances_idx[z].append([])
-                self._distances_val[z].append([])
-                poscell = np.array([self.centersi[z][cell], self.centersj[z][cell]])
-                self._distances_idx[z][cell].append([])
-                self._distances_idx[z][cell].append([])
-                self._distances_val[z][cell].append([])
-                self._distances_val[z][cell].append([])
-                if z>0:
-                    for cellpre,_ in enumerate(self.centersi[z-1]):
-                        poscell2 = np.array([self.centersi[z-1][cellpre], self.centersj[z-1][cellpre]])    
-                        dist = np.linalg.norm(poscell-poscell2)
-                        if dist < distance_th:
-                            self._distances_idx[z][cell][0].append(cellpre)
-                            self._distances_val[z][cell][0].append(dist)
-                if z<self.slices-1:
-                    for cellpost,_ in enumerate(self.centersi[z+1]):
-                        poscell2 = np.array([self.centersi[z+1][cellpost], self.centersj[z+1][cellpost]])           
-                        dist = np.linalg.norm(poscell-poscell2)
-                        if dist < distance_th:
-                            self._distances_idx[z][cell][1].append(cellpost)
-                            self._distances_val[z][cell][1].append(dist)    
+
+            # Neighbors of each cell on the previous (0) and next (1) planes
+            neighs = []
+            for zz in [z-1, z+1]:
+                if 0 <= zz < self.slices and trees[z] is not None and trees[zz] is not None:
+                    neighs.append((zz, trees[z].query_ball_tree(trees[zz], r=distance_th)))
+                else:
+                    neighs.append(None)
+
+            for cell in range(len(points[z])):
+                self._distances_idx[z].append([[], []])
+                self._distances_val[z].append([[], []])
+                for k, neigh in enumerate(neighs):
+                    if neigh is None:
+                        continue
+                    zz, idxs = neigh
+                    idxs  = np.sort(np.array(idxs[cell], dtype=np.int64))
+                    dists = np.linalg.norm(points[zz][idxs] - points[z][cell], axis=1)
+                    close = dists < distance_th
+                    self._distances_idx[z][cell][k] = idxs[close].tolist()
+                    self._distances_val[z][cell][k] = dists[close].tolist()
 
     def _assign_labels(self):
         self.labels=[]
-        last_label=None
-        used_labels = []
+        # Labels are given in increasing order, a new label is always max_label+1
+        max_label=-1
+        # Index of the cell holding each label in the current plane
+        current_label_to_idx = {}
         for z in range(self.slices):
             self.labels.append([])
-            current_labels=[]
-            current_labels_cell=[]
+            current_label_to_idx.clear()
             for cell, outline in enumerate(self.Outlines[z]):
                 
                 # If this is the first plane, start filling
-                if z==0:
-                    if last_label==None:
-                        label=0
-                    else:
-                        label=last_label+1
+                if z==0 or max_label==-1:
+                    max_label+=1
+                    label=max_label
                 
                 # Otherwise do the magic
-                elif z>0:
-                    if last_label==None:
-                        label=0
+                else:
+                    if len(self._distances_val[z][cell][0])== 0:
+                        max_label+=1
+                        label=max_label
                     else:
-                        if len(self._distances_val[z][cell][0])== 0:
-                            label=last_label+1
-                        else:
-                            idx_closest_cell = self._distances_idx[z][cell][0][np.argmin(self._distances_val[z][cell][0])]
-                            label = self.labels[z-1][idx_closest_cell]
-                            if label in current_labels:
-                                curr_dist  = np.min(self._distances_val[z][cell][0])
-                                idx_other  = np.where(current_labels==label)[0][0]
-                                close_cells = True
-
-                                if len(self._distances_val[z][idx_other])==0:
+                        idx_closest_cell = self._distances_idx[z][cell][0][np.argmin(self._distances_val[z][cell][0])]
+                        label = self.labels[z-1][idx_closest_cell]
+                        if label in current_label_to_idx:
+                            curr_dist  = np.min(self._distances_val[z][cell][0])
+                            idx_other  = current_label_to_idx[label]
+                            close_cells = True
+
+                            if len(self._distances_val[z][idx_other])==0:
+                                close_cells=False
+                            else:
+                                if len(self._distances_val[z][idx_other][0])==0:
                                     close_cells=False
+                            
+                            if close_cells:
+                                other_dist = np.min(self._distances_val[z][idx_other][0])
+                                if curr_dist<other_dist:
+                                    max_label+=1
+                                    current_label_to_idx[max_label]=idx_other
+                                    self.labels[z][idx_other]=max_label
                                 else:
-                                    if len(self._distances_val[z][idx_other][0])==0:
-                                        close_cells=False
-                                
-                                if close_cells:
-                                    other_dist = np.min(self._distances_val[z][idx_other][0])
-                                    if curr_dist<other_dist:
-                                        current_labels[idx_other]=last_label+1
-                                        self.labels[z][idx_other]=last_label+1
-                                    else:
-                                        label = last_label+1
-                                else:
-                                    current_labels[idx_other]=last_label+1
-                                    self.labels[z][idx_other]=last_label+1
+                                    max_label+=1
+                                    label=max_label
+                            else:
+                                max_label+=1
+                                current_label_to_idx[max_label]=idx_other
+                                self.labels[z][idx_other]=max_label
 
-                used_labels.append(label)
-                current_labels.append(label)
-                current_labels_cell.append(cell)
-                last_label=np.max(used_labels)
+                current_label_to_idx[label]=cell
                 self.labels[z].append(label)
+        self._label_per_z_dirty = True
+        self._masks_version    += 1
 
     def _label_per_z(self):
         # Data re-structuring to correct possible alignment of contiguous cells along the z axis. 
-        self._Zlabel_l = []
-        self._Zlabel_z = []
-        for z in range(30):
-            for l in self.labels[z]:
-                if l not in self._Zlabel_l:
-                    self._Zlabel_l.append(l)
-                    self._Zlabel_z.append([])
-                id = self._Zlabel_l.index(l)
-                self._Zlabel_z[id].append(z)
+        # It only depends on the labels, so it is recomputed only when these have changed.
+        if not self._label_per_z_dirty:
+            return
+        all_l = np.array([l for labs in self.labels for l in labs], dtype=np.int64)
+        if all_l.size == 0:
+            self._Zlabel_l = []
+            self._Zlabel_z = []
+            self._label_to_idx = {}
+            self._label_per_z_dirty = False
+            return
+        all_z = np.repeat(np.arange(self.slices), [len(labs) for labs in self.labels])
+        uniq, inv, counts = np.unique(all_l, return_inverse=True, return_counts=True)
+
+        # Group the z-levels of each label, keeping them sorted
+        order = np.argsort(inv.ravel(), kind='stable')
+        self._Zlabel_l = uniq.tolist()
+        self._Zlabel_z = [zs.tolist() for zs in np.split(all_z[order], np.cumsum(counts)[:-1])]
+        self._label_to_idx = {l: id for id, l in enumerate(self._Zlabel_l)}
+        self._label_per_z_dirty = False
+
+    def _remove_labels(self, removals_by_z):
+        # Remove the cells with the given labels at each z. removals_by_z maps z to a set of labels.
+        # Every list is rebuilt once instead of popping the cells one by one.
+        for z, labs in removals_by_z.items():
+            keep = [l not in labs for l in self.labels[z]]
+            self.labels[z]   = list(itertools.compress(self.labels[z], keep))
+            self.Outlines[z] = list(itertools.compress(self.Outlines[z], keep))
+            self.Masks[z]    = list(itertools.compress(self.Masks[z], keep))
+        self._label_per_z_dirty = True
+        self._masks_version    += 1
 
     def _remove_short_cells(self):
         self._label_per_z()
-        labels_to_remove = []
+        removals_by_z = {}
         for id, l in enumerate(self._Zlabel_l):        
             if len(self._Zlabel_z[id]) < 2: # Threshold for how many planes a cell has to be to be considered
-                labels_to_remove.append(l)
-        for z, labs in enumerate(self.labels):
-            for l in labels_to_remove:
-                if l in labs:
-                    id_l=labs.index(l)
-                    self.labels[z].pop(id_l)
-                    self.Outlines[z].pop(id_l)
-                    self.Masks[z].pop(id_l)
+                for z in self._Zlabel_z[id]:
+                    removals_by_z.setdefault(z, set()).add(l)
+        self._remove_labels(removals_by_z)
 
     def _nuclear_intensity_cell_z(self):
         self._label_per_z()
@@ -314,60 +558,44 @@ class CellSegmentation(object):
                 self._Zsignals.append([])
                 for z in self._Zlabel_z[id]:
                     id_l = self.labels[z].index(l)
-                    img  = self.stack[z,:,:]#/np.max(self.stack[z,:,:])
-                    mask = self.Masks[z][id_l]
-                    self._Zsignals[-1].append(np.sum(img[mask[:,1], mask[:,0]]))
-
-    def _compute_overlap(self, m1, m2):
-            nrows, ncols = m1.shape
-            dtype={'names':['f{}'.format(i) for i in range(ncols)],
-                'formats':ncols * [m1.dtype]}
-
-            C = np.intersect1d(m1.view(dtype), m2.view(dtype))
-
-            # This last bit is optional if you're okay with "C" being a structured array...
-            cl = C.view(m1.dtype).reshape(-1, ncols)
-            if self._relative:
-                denominador = np.minimum(len(m1), len(m2))
-                return 100*len(cl)/denominador
-            else:
-                denominador = np.add(len(m1), len(m2))
-                return 200*len(cl)/denominador
+                    self._Zsignals[-1].append(self._cell_sums[z][id_l])
 
-    def _compute_planes_overlap(self):
-        self._Zoverlaps = []
-        for c in range(len(self._Zlabel_l)):
-            lab = self._Zlabel_l[c]
-            self._Zoverlaps.append(np.zeros((len(self._Zlabel_z[c]), len(self._Zlabel_z[c]))))
-            for i, z in enumerate(self._Zlabel_z[c]):
-                lid_curr  = self.labels[z].index(lab)
-                mask_curr = self.Masks[z][lid_curr]
-                if self._fullmat:
-                    zvec = self._Zlabel_z[c]
-                else:
-                    zvec = self._Zlabel_z[c][0:i]
-                for j, zz in enumerate(zvec):
-                    if zz!=z:
-                        lid_other  = self.labels[zz].index(lab)
-                        mask_other = self.Masks[zz][lid_other]
-                        self._Zoverlaps[c][i,j]=self._compute_overlap(mask_curr, mask_other)
+    def _compute_mask_bitmaps(self):
+        # Bit-packed version of every mask, used to compute overlaps.
+        self._mask_bitmaps = []
+        for z in range(self.slices):
+            self._mask_bitmaps.append([mask_bitmap(mask) for mask in self.Masks[z]])
+
+    def _compute_overlap(self, b1, b2):
+        ninter = bitmaps_intersection_size(b1, b2)
+        if self._relative:
+            denominador = np.minimum(b1[3], b2[3])
+            return 100*ninter/denominador
+        else:
+            denominador = np.add(b1[3], b2[3])
+            return 200*ninter/denominador
 
     def _compute_overlap_measure(self):
-        self._compute_planes_overlap()
+        # Mean overlap of each plane of a cell with its planes within the z neighborhood.
+        # The overlap is symmetric, so each pair of planes is computed once and
+        # added to both. Without the full matrix only the lower planes contribute.
         self._Zoverlaps_conv = []
-        for c, Zoverlap in enumerate(self._Zoverlaps):
-            self._Zoverlaps_conv.append([])
-            for z in range(Zoverlap.shape[0]):
-                val = 0.0
-                n   = 0
-                for i in range(np.maximum(z-self._zneigh, 0), np.minimum(z+self._zneigh+1, Zoverlap.shape[0])):
-                    if i!=z:
-                        val+=Zoverlap[z, i]
-                        n+=1
-                if n == 0:
-                    self._Zoverlaps_conv[-1].append(0.0)
-                else:
-                    self._Zoverlaps_conv[-1].append(val/n)
+        for c in range(len(self._Zlabel_l)):
+            lab = self._Zlabel_l[c]
+            zs  = self._Zlabel_z[c]
+            masks = [self._mask_bitmaps[z][self.labels[z].index(lab)] for z in zs]
+            val = np.zeros(len(zs))
+            n   = np.zeros(len(zs))
+            for i in range(len(zs)):
+                for j in range(np.maximum(i-self._zneigh, 0), i):
+                    if zs[i]!=zs[j]:
+                        overlap = self._compute_overlap(masks[i], masks[j])
+                        val[i] += overlap
+                        if self._fullmat:
+                            val[j] += overlap
+                    n[i] += 1
+                    n[j] += 1
+            self._Zoverlaps_conv.append([val[i]/n[i] if n[i]>0 else 0.0 for i in range(len(zs))])
 
     def _detect_cell_barriers(self):
         self._nuclear_intensity_cell_z()
@@ -375,7 +603,6 @@ class CellSegmentation(object):
 
         self._cellbarriers = []
         for c in range(len(self._Zsignals)):
-            self._cellbarriers.append([])
             intensity = np.array(self._Zsignals[c])*np.array(self._Zoverlaps_conv[c])
 
             # Find data valleys and their corresponding idxs
@@ -387,71 +614,21 @@ class CellSegmentation(object):
             datapeaks_idx = np.arange(0,len(datapeaks))[datapeaks]
 
             # For each local minima, apply conditions for it to be considered a cell barrier plane.
-            # Zlevel_cbs_to_pop correspongs to the z plane at which there might be a cell barrier. 
-            for Zlevel_cb in datavalleys_idx:
-                if Zlevel_cb==0:
-                    pass
-                elif Zlevel_cb==len(datavalleys)-1:
-                    pass
-                else:  
-                    self._cellbarriers[-1].append(Zlevel_cb)
-
-            keep_checking = True
-            # remove a deltabarrier if the distance between two barriers is lower than a threshold.
-            while keep_checking:                
-                keep_checking=False
-                Zlevel_cbs_to_pop = []
-                Zlevel_cbs_to_add = []
-                for i, Zlevel_cb in enumerate(self._cellbarriers[-1][0:-1]):
-                    dif = self._cellbarriers[-1][i+1] - Zlevel_cb
-                    if dif < 5:                  
-                        if i not in Zlevel_cbs_to_pop:
-                            Zlevel_cbs_to_pop.append(i)
-                        if i+1 not in Zlevel_cbs_to_pop:
-                            Zlevel_cbs_to_pop.append(i+1)
-                        new_cb = np.argmax(intensity[Zlevel_cb:self._cellbarriers[-1][i+1]]) + Zlevel_cb
-                        Zlevel_cbs_to_add.append(new_cb)
-                        intensity[Zlevel_cb:self._cellbarriers[-1][i+1]+1] = np.ones(len(intensity[Zlevel_cb:self._cellbarriers[-1][i+1]+1]))*intensity[new_cb]
-                        keep_checking=True
-                Zlevel_cbs_to_pop.reverse()
-                for i in Zlevel_cbs_to_pop:
-                    self._cellbarriers[-1].pop(i)
-                for new_cb in Zlevel_cbs_to_add:
-                    self._cellbarriers[-1].append(new_cb)
-                self._cellbarriers[-1].sort()
-
-            Zlevel_cbs_to_pop = []
-            for i, Zlevel_cb in enumerate(self._cellbarriers[-1]):
-                closest_peak_right_idx  = datapeaks_idx[datapeaks_idx > Zlevel_cb].min()
-                closest_peak_left_idx   = datapeaks_idx[datapeaks_idx < Zlevel_cb].max() 
-                inten_peak1 = intensity[closest_peak_left_idx]
-                inten_peak2 = intensity[closest_peak_right_idx]
-                inten_peak  = np.minimum(inten_peak1, inten_peak2)
-                inten_cb    = intensity[Zlevel_cb]
-                if (inten_peak - inten_cb)/inten_peak < self._overlap_th: #0.2 threshold of relative height of the valley to the peak
-                    Zlevel_cbs_to_pop.append(i)
-
-            Zlevel_cbs_to_pop.reverse()
-            for i in Zlevel_cbs_to_pop:
-                self._cellbarriers[-1].pop(i)
+            # The first and last planes are never a cell barrier.
+            valleys = datavalleys_idx[(datavalleys_idx>0) & (datavalleys_idx<len(datavalleys)-1)]
+            cellbarriers = _merge_cell_barriers(intensity, valleys, datapeaks_idx, self._overlap_th)
+            self._cellbarriers.append(cellbarriers.tolist())
 
     def _separate_concatenated_cells(self):
         self._label_per_z()
         self._detect_cell_barriers()
-        zids_remove = []
-        labs_remove = []
+        removals_by_z = {}
         for c, cbs in enumerate(self._cellbarriers):
-            if len(cbs) != 0:
-                for cb in cbs:
-                    zlevel = self._Zlabel_z[c][cb]
-                    label  = self._Zlabel_l[c]
-                    zids_remove.append(zlevel)
-                    labs_remove.append(label)
-        for i, z in enumerate(zids_remove):
-            lid = self.labels[z].index(labs_remove[i])
-            self.labels[z].pop(lid)
-            self.Outlines[z].pop(lid)
-            self.Masks[z].pop(lid)
+            for cb in cbs:
+                zlevel = self._Zlabel_z[c][cb]
+                label  = self._Zlabel_l[c]
+                removals_by_z.setdefault(zlevel, set()).add(label)
+        self._remove_labels(removals_by_z)
     
     def _update(self):
         self._extract_cell_centers()
@@ -459,6 +636,7 @@ class CellSegmentation(object):
         self._assign_labels()
         self._label_per_z()
         self._nuclear_intensity_cell_z()
+        self._compute_mask_bitmaps()
         self._compute_overlap_measure()
 
     def _position3d(self):
@@ -466,41 +644,44 @@ class CellSegmentation(object):
         self.centers_positions = []
         self.centers_weight    = []
         self.centers_outlines  = []
+        label_to_center = {}
         for z in range(self.slices):
-            img = self.stack[z,:,:]
             for cell, outline in enumerate(self.Outlines[z]):
-                ptsin = self.Masks[z][cell]
                 xs = self.centersi[z][cell]
                 ys = self.centersj[z][cell]
                 label = self.labels[z][cell]
-                if label not in self.labels_centers:
+                if label not in label_to_center:
+                    label_to_center[label] = len(self.labels_centers)
                     self.labels_centers.append(label)
                     self.centers_positions.append([z,ys,xs])
-                    self.centers_weight.append(np.sum(img[ptsin[:,1], ptsin[:,0]]))
+                    self.centers_weight.append(self._cell_sums[z][cell])
                     self.centers_outlines.append(outline)
                 else:
-                    curr_weight = np.sum(img[ptsin[:,1], ptsin[:,0]])
-                    idx_prev    = np.where(np.array(self.labels_centers)==label)[0][0]
+                    curr_weight = self._cell_sums[z][cell]
+                    idx_prev    = label_to_center[label]
                     prev_weight = self.centers_weight[idx_prev]
                     if curr_weight > prev_weight:
                         self.centers_positions[idx_prev] = [z, ys, xs]
                         self.centers_outlines[idx_prev]  = outline
                         self.centers_weight[idx_prev] = curr_weight
+        # The same centers as a (cells, 3) array of (z, y, x), used for tracking
+        self.centers_zyx = np.array(self.centers_positions, dtype=np.float32).reshape(-1, 3)
 
     def _sort_point_sequence(self, outline):
         min_dists, min_dist_idx = cKDTree(outline).query(outline,self._nearest_neighs)
-        min_dists = min_dists[:,1:]
         min_dist_idx = min_dist_idx[:,1:]
-        new_outline = []
-        used_idxs   = []
-        pidx = random.choice(range(len(outline)))
-        new_outline.append(outline[pidx])
+        used      = np.zeros(len(outline), dtype=np.bool_)
+        used_idxs = []
+        # Start the walk at the leftmost point
+        pidx = int(np.argmin(outline[:,0]))
+        used[pidx] = True
         used_idxs.append(pidx)
-        while len(new_outline)<len(outline):
+        while len(used_idxs)<len(outline):
             a = len(used_idxs)
             for id in min_dist_idx[pidx,:]:
-                if id not in used_idxs:
-                    new_outline.append(outline[id])
+                # Missing neighbors are returned with index len(outline)
+                if id<len(outline) and not used[id]:
+                    used[id] = True
                     used_idxs.append(id)
                     pidx=id
                     break
@@ -508,32 +689,16 @@ class CellSegmentation(object):
                 self.printfancy("Improve your point drawing, this is a bit embarrasing") 
                 self.PACT.visualization()
                 return
-        return np.array(new_outline), used_idxs
+        return outline[used_idxs], used_idxs
 
     def _increase_point_resolution(self, outline):
-        rounds = np.ceil(np.log2(self._min_outline_length/len(outline))).astype('int32')
-        if rounds==0:
-                newoutline_new=np.copy(outline)
-        for r in range(rounds):
-            if r==0:
-                pre_outline=np.copy(outline)
-            else:
-                pre_outline=np.copy(newoutline_new)
-            newoutline_new = np.copy(pre_outline)
-            i=0
-            while i < len(pre_outline)*2 - 2:
-                newpoint = np.array([np.rint((newoutline_new[i] + newoutline_new[i+1])/2).astype('int32')])
-                newoutline_new = np.insert(newoutline_new, i+1, newpoint, axis=0)
-                i+=2
-            newpoint = np.array([np.rint((pre_outline[-1] + pre_outline[0])/2).astype('int32')])
-            newoutline_new = np.insert(newoutline_new, 0, newpoint, axis=0)
-
-        return newoutline_new
+        return increase_point_resolution(outline, self._min_outline_length)
 
     def update_labels(self,extract_labels=True):
         if extract_labels:
             self._update()
         self._position3d()
+        self._masks_version += 1
         self.printfancy("")
         self.printfancy("## Labels updated ##")
 
@@ -566,42 +731,79 @@ class CellSegmentation(object):
             print("#   Progress: [", tags, spaces, "] ", percents, "  #", sep="")
 
     def compute_Masks_to_plot(self):
-        self._Masks_to_plot = np.zeros_like(self.stack, dtype=np.int32)
-        self._Masks_to_plot_alphas = np.zeros_like(self.stack, dtype=np.int32)
-        for z in range(0,self.slices):
-            for cell in range(0,len(self.Masks[z])):
-                lab = self.labels[z][cell]
-                for idpair in self.Masks[z][cell]:
-                    id1 = idpair[0]
-                    id2 = idpair[1]
-                    self._Masks_to_plot[z][id2][id1] = self._labels_color_id[lab]
-                    self._Masks_to_plot_alphas[z][id2][id1] = 1
+        self._flatten_masks()
+
+        # RGBA color of every mask pixel, from the label of the cell it belongs to
+        labels = np.array([lab for labs in self.labels for lab in labs], dtype=np.int64)
+        self._Masks_to_plot_rgba = np.repeat(self._label_rgba_lut[labels], self._masks_lengths, axis=0)
+
+        # First mask pixel of each z
+        pixels_offsets = np.zeros(len(self._masks_lengths)+1, dtype=np.int64)
+        pixels_offsets[1:] = np.cumsum(self._masks_lengths)
+        self._Masks_to_plot_offsets = pixels_offsets[self._cells_offsets]
+
+        # The RGBA overlays are computed from these when each z is plotted
+        self._mask_rgba_cache = {}
+        self._masks_cache_ver = self._masks_version
+
+    def _mask_rgba(self, z):
+        # RGBA overlay of the masks of plane z. It is kept until the masks or their labels change.
+        # The mask colors of the whole stack are computed once after every change, not once per axis.
+        if self._masks_cache_ver != self._masks_version:
+            self.compute_Masks_to_plot()
+        if z not in self._mask_rgba_cache:
+            p0 = self._Masks_to_plot_offsets[z]
+            p1 = self._Masks_to_plot_offsets[z+1]
+            xs = self._masks_xy[p0:p1,0]
+            ys = self._masks_xy[p0:p1,1]
+            masks = np.zeros((self.stack_dims[1], self.stack_dims[2], 4), dtype=np.uint8)
+            masks[ys, xs] = self._Masks_to_plot_rgba[p0:p1]
+            self._mask_rgba_cache[z] = masks
+        return self._mask_rgba_cache[z]
 
     def _assign_color_to_label(self):
         coloriter = itertools.cycle([i for i in range(len(self._masks_colors))])
         self._labels_color_id = [next(coloriter) for i in range(1000)]
+        # RGBA color of every label
+        self._label_rgba = to_rgba_array(self._masks_colors).astype(np.float32)[self._labels_color_id]
+        self._label_rgba_lut = (self._label_rgba*255).astype(np.uint8)
 
     def plot_axis(self, _ax, img, z):
-        _ = _ax.imshow(img)
+        # The images of an axis are created once and then updated with set_data.
+        # Only the cell markers are removed and drawn again.
+        artists = self._axis_artists.get(_ax)
+        if artists is None:
+            artists = {"img": _ax.imshow(img), "masks": None, "cells": []}
+            self._axis_artists[_ax] = artists
+        else:
+            artists["img"].set_data(img)
+            for artist in artists["cells"]:
+                artist.remove()
+            artists["cells"] = []
         _ = _ax.set_title("z = %d" %z)
-        for cell, outline in enumerate(self.Outlines[z]):
+        _ = _ax.axis(False)
+        # The outlines and centers of all the cells are drawn with a single scatter each
+        if len(self.Outlines[z])!=0:
+            lengths = [len(outline) for outline in self.Outlines[z]]
+            colors  = self._label_rgba[self.labels[z]]
+            outlines_xy = np.concatenate(self.Outlines[z])
+            artists["cells"].append(_ax.scatter(outlines_xy[:,0], outlines_xy[:,1], c=np.repeat(colors, lengths, axis=0), s=0.5))
+            artists["cells"].append(_ax.scatter(self.centersj[z], self.centersi[z], s=0.5, c="white"))
+        for cell, label in enumerate(self.labels[z]):
             xs = self.centersi[z][cell]
             ys = self.centersj[z][cell]
-            label = self.labels[z][cell]
-            _ = _ax.scatter(outline[:,0], outline[:,1], c=[self._masks_colors[self._labels_color_id[label]]], s=0.5, cmap=self._masks_cmap_name)               
-            _ = _ax.annotate(str(label), xy=(ys, xs), c="w")
-            _ = _ax.scatter([ys], [xs], s=0.5, c="white")
-            _ = _ax.axis(False)
+            artists["cells"].append(_ax.annotate(str(label), xy=(ys, xs), c="w"))
 
         if self.pltmasks_bool:
-            self.compute_Masks_to_plot()
-            _ = _ax.imshow(self._masks_cmap(self._Masks_to_plot[z], alpha=self._Masks_to_plot_alphas[z], bytes=True), cmap=self._masks_cmap_name)
-        for lab in range(len(self.labels_centers)):
-            zz = self.centers_positions[lab][0]
-            ys = self.centers_positions[lab][1]
-            xs = self.centers_positions[lab][2]
-            if zz==z:
-                _ = _ax.scatter([ys], [xs], s=3.0, c="k")
+            masks = self._mask_rgba(z)
+            if artists["masks"] is None:
+                artists["masks"] = _ax.imshow(masks, cmap=self._masks_cmap_name)
+            else:
+                artists["masks"].set_data(masks)
+        # 3D centers of the cells lying on this plane, with a single scatter
+        centers = self.centers_zyx[self.centers_zyx[:,0]==z]
+        if len(centers)!=0:
+            artists["cells"].append(_ax.scatter(centers[:,1], centers[:,2], s=3.0, c="k"))
 
 class plotCounter:
     def __init__(self, layout, totalsize, overlap ):
@@ -666,6 +868,18 @@ class plotRound:
         else:
             return None, self.currentonround, self.currentround
 
+    def arrays(self):
+        # z, position on the layout and round of every spot of the round, computed at once.
+        # Spots without a z are marked with -1.
+        first  = (self.groupsize*self.currentround)-(self.overlap*self.currentround)
+        ids    = np.arange(self.groupsize)
+        zs     = first + ids
+        if self.currentround >= self.rounds:
+            zs[:] = -1
+        zs[zs >= self.totalsize] = -1
+        rounds = np.full(self.groupsize, self.currentround)
+        return zs, ids, rounds
+
 class backup_CellTrack():
     def __init__(self, t, CT):
         self._assign(t, CT)
@@ -675,7 +889,7 @@ class backup_CellTrack():
 
     def _assign(self, t, CT):
         self.t = copy(t)
-        self.cells = deepcopy(CT.cells)
+        self.cells = [cell._copy() for cell in CT.cells]
         self.apo_evs   = deepcopy(CT.apoptotic_events)
         self.mit_evs   = deepcopy(CT.mitotic_events)
 
@@ -741,6 +955,20 @@ class Cell():
         self._sort_over_z()
         self._sort_over_t()
         self._extract_cell_centers(CT)
+
+    def _copy(self):
+        # Copy of the cell that shares the outline and mask arrays, which are never modified in place.
+        # Only the lists, which the corrections do modify, are copied.
+        new_cell = copy(self)
+        new_cell.zs       = [list(zs) for zs in self.zs]
+        new_cell.times    = list(self.times)
+        new_cell.outlines = [list(outlines) for outlines in self.outlines]
+        new_cell.masks    = [list(masks) for masks in self.masks]
+        new_cell.centersi = [list(centersi) for centersi in self.centersi]
+        new_cell.centersj = [list(centersj) for centersj in self.centersj]
+        new_cell.centers  = [list(center) for center in self.centers]
+        new_cell.centers_weight = list(self.centers_weight)
+        return new_cell
             
     def _sort_over_z(self):
         idxs = []
@@ -820,8 +1048,10 @@ class Cell():
 
 class CellTracking(object):
     def __init__(self, stacks, model, embcode, trainedmodel=None, channels=[0,0], flow_th_cellpose=0.4, distance_th_z=3.0, xyresolution=0.2767553, relative_overlap=False, use_full_matrix_to_compute_overlap=True, z_neighborhood=2, overlap_gradient_th=0.3, plot_layout=(2,3), plot_overlap=1, plot_masks=True, masks_cmap='tab10', min_outline_length=200, neighbors_for_sequence_sorting=7, plot_tracking_windows=1, backup_steps=5, time_step=None, cell_distance_axis="xy", mean_substraction_cell_movement=False):
+        from matplotlib import cm
         self.embcode           = embcode
         self.stacks            = stacks
+        self._stacks_u8        = None
         self._model            = model
         self._trainedmodel     = trainedmodel
         self._channels         = channels
@@ -853,6 +1083,8 @@ class CellTracking(object):
         self.plot_tracking_windows=plot_tracking_windows
         self._tstep = time_step
         self._mscm   = mean_substraction_cell_movement
+        self._Dists_buf = np.empty(64*64, dtype=np.float32)
+        self._round_cache = {}
         self._assign_color_to_label()
 
     def printfancy(self, string, finallength=70):
@@ -877,6 +1109,7 @@ class CellTracking(object):
         self.backups = deque([self._backupCT], self._backup_steps)
         self.printfancy("")
         self.printfancy("Plotting...")
+        import matplotlib.pyplot as plt
         plt.close("all")
         self.plot_tracking()
         self.printfancy("")
@@ -889,7 +1122,7 @@ class CellTracking(object):
             backup = self.backups.pop()
             gc.collect()
         
-        self.cells = deepcopy(backup.cells)
+        self.cells = [cell._copy() for cell in backup.cells]
         self._update_CT_cell_attributes()
         self.apoptotic_events = deepcopy(backup.apo_evs)
         self.mitotic_events = deepcopy(backup.mit_evs)
@@ -914,36 +1147,49 @@ class CellTracking(object):
         self._labels   = []
         self._Zlabel_zs= []
         self._Zlabel_ls= []
+        self._Zlabel_idxs = []
         print("######################   BEGIN SEGMENTATIONS   ######################")
-        for t in range(self.times):
-            imgs = self.stacks[t,:,:,:]
-            CS = CellSegmentation( imgs, self._model, self.embcode, trainedmodel=self._trainedmodel
-                                , channels=self._channels
-                                , flow_th_cellpose=self._flow_th_cellpose
-                                , distance_th_z=self._distance_th_z
-                                , xyresolution=self._xyresolution
-                                , relative_overlap=self._relative
-                                , use_full_matrix_to_compute_overlap=self._fullmat
-                                , z_neighborhood=self._zneigh
-                                , overlap_gradient_th=self._overlap_th
-                                , masks_cmap=self._masks_cmap_name
-                                , min_outline_length=self._min_outline_length
-                                , neighbors_for_sequence_sorting=self._nearest_neighs)
+        # Cellpose runs on the main thread. The post-processing of each time runs on a worker
+        # thread while the stack of the next time is being segmented.
+        postprocessings = []
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            for t in range(self.times):
+                imgs = self.stacks[t,:,:,:]
+                CS = CellSegmentation( imgs, self._model, self.embcode, trainedmodel=self._trainedmodel
+                                    , channels=self._channels
+                                    , flow_th_cellpose=self._flow_th_cellpose
+                                    , distance_th_z=self._distance_th_z
+                                    , xyresolution=self._xyresolution
+                                    , relative_overlap=self._relative
+                                    , use_full_matrix_to_compute_overlap=self._fullmat
+                                    , z_neighborhood=self._zneigh
+                                    , overlap_gradient_th=self._overlap_th
+                                    , masks_cmap=self._masks_cmap_name
+                                    , min_outline_length=self._min_outline_length
+                                    , neighbors_for_sequence_sorting=self._nearest_neighs)
+
+                self.printfancy("")
+                self.printfancy("######   CURRENT TIME = %d   ######" %t)
+                self.printfancy("")
+                CS._cell_segmentation_outlines()
+                self.printfancy("")
+                self.printfancy("Raw segmentation completed. Proceeding to next time")
+                postprocessings.append((CS, executor.submit(CS._segmentation_postprocessing)))
 
             self.printfancy("")
-            self.printfancy("######   CURRENT TIME = %d   ######" %t)
-            self.printfancy("")
-            CS()
-            self.printfancy("Segmentation and corrections completed. Proceeding to next time")
-            self.TLabels.append(CS.labels_centers)
-            self.TCenters.append(CS.centers_positions)
-            self.TOutlines.append(CS.centers_outlines)
-            self.label_correspondance.append([])        
-            self._Outlines.append(CS.Outlines)
-            self._Masks.append(CS.Masks)
-            self._labels.append(CS.labels)
-            self._Zlabel_zs.append(CS._Zlabel_z)
-            self._Zlabel_ls.append(CS._Zlabel_l)
+            self.printfancy("Waiting for segmentation post-processing...")
+            for CS, postprocessing in postprocessings:
+                postprocessing.result()
+                self.TLabels.append(CS.labels_centers)
+                self.TCenters.append(CS.centers_zyx)
+                self.TOutlines.append(CS.centers_outlines)
+                self.label_correspondance.append([])        
+                self._Outlines.append(CS.Outlines)
+                self._Masks.append(CS.Masks)
+                self._labels.append(CS.labels)
+                self._Zlabel_zs.append(CS._Zlabel_z)
+                self._Zlabel_ls.append(CS._Zlabel_l)
+                self._Zlabel_idxs.append(CS._label_to_idx)
             self.printfancy("")
         print("###############      ALL SEGMENTATIONS COMPLEATED     ###############")
 
@@ -954,78 +1200,96 @@ class CellTracking(object):
         FinalLabels   = []
         FinalCenters  = []
         FinalOutlines = []
-        for t in range(np.shape(self.stacks)[0]):
+        # Scale of the (z, y, x) centers so that the distances in xy are physical ones. Each frame is scaled once
+        scale = np.array([1.0, self._xyresolution, self._xyresolution], dtype=np.float32)
+        for t in range(self.times):
             if t==0:
                 FinalLabels.append(TLabels[0])
                 FinalCenters.append(TCenters[0])
                 FinalOutlines.append(TOutlines[0])
-                labmax = np.max(FinalLabels[0])
-                for lab in TLabels[0]:
-                    self.label_correspondance[0].append([lab, lab])
+                labmax = max(FinalLabels[0])
+                self.label_correspondance[0] = np.repeat(np.asarray(TLabels[0], dtype=np.int32).reshape(-1, 1), 2, axis=1)
+                prev = TCenters[0]*scale
             else:
                 FinalLabels.append([])
-                FinalCenters.append([])
                 FinalOutlines.append([])
 
-                Dists = np.ones((len(FinalLabels[t-1]), len(TLabels[t])))
-                for i in range(len(FinalLabels[t-1])):
-                    poscell1 = np.array(FinalCenters[t-1][i][1:])*np.array([self._xyresolution, self._xyresolution])
-                    for j in range(len(TLabels[t])): 
-                        poscell2 = np.array(TCenters[t][j][1:])*np.array([self._xyresolution, self._xyresolution])
-                        Dists[i,j] = np.linalg.norm(poscell1-poscell2)
-                        if np.abs(FinalCenters[t-1][i][0] - TCenters[t][j][0])>2:
-                            Dists[i,j] = 100.0
-
-                a = np.argmin(Dists, axis=0) # max prob for each future cell to be a past cell
-                b = np.argmin(Dists, axis=1) # max prob for each past cell to be a future one
-                correspondance = []
-                notcorrespondenta = []
-                notcorrespondentb = []
-                for i,j in enumerate(b):
-                    if i==a[j]:
-                        if Dists[i,j] < 7.5:
-                            correspondance.append([i,j]) #[past, future]
-                            self.label_correspondance[t].append([TLabels[t][j], FinalLabels[t-1][i]])
-                            FinalLabels[t].append(FinalLabels[t-1][i])
-                            FinalCenters[t].append(TCenters[t][j])
-                            FinalOutlines[t].append(TOutlines[t][j])                            
-                    else:
-                        notcorrespondenta.append(i)
-                labmax = np.maximum(np.max(FinalLabels[t-1]), labmax)
-                for j in range(len(a)):
-                    if j not in np.array(correspondance)[:,1]:
-                        self.label_correspondance[t].append([TLabels[t][j], labmax+1])
-                        FinalLabels[t].append(labmax+1)
-                        labmax+=1
-                        FinalCenters[t].append(TCenters[t][j])
-                        FinalOutlines[t].append(TOutlines[t][j])
-                        notcorrespondentb.append(j)
+                curr = TCenters[t]*scale
+                # Only cells with a partner within the threshold in xy can be matched, found with KD-trees.
+                # The distance matrix and the assignment are restricted to those cells
+                rows = np.empty(0, dtype=np.int64)
+                cols = np.empty(0, dtype=np.int64)
+                if len(prev)!=0 and len(curr)!=0:
+                    cand = cKDTree(prev[:,1:]).sparse_distance_matrix(cKDTree(curr[:,1:]), 7.5, output_type='coo_matrix')
+                    rows_c = np.unique(cand.row)
+                    cols_c = np.unique(cand.col)
+                    if len(rows_c)!=0:
+                        Dists = self._dists_matrix(len(rows_c), len(cols_c))
+                        _gated_dist(prev[rows_c], curr[cols_c], 2.0, 7.5, 1e6, Dists)
+
+                        # Optimal one to one assignment between past and future cells. Disallowed pairs cost more
+                        # than any set of valid ones, so the number of valid matches is maximized; they are dropped after.
+                        rows, cols = linear_sum_assignment(Dists)
+                        matched = Dists[rows, cols] < 7.5
+                        rows = rows_c[rows[matched]]
+                        cols = cols_c[cols[matched]]
+                rows = rows.tolist() #past
+                cols = cols.tolist() #future
+                for i, j in zip(rows, cols):
+                    FinalLabels[t].append(FinalLabels[t-1][i])
+                    FinalOutlines[t].append(TOutlines[t][j])
+                labmax = max(max(FinalLabels[t-1]), labmax)
+                # Future cells without a past one get new labels
+                future_taken = np.zeros(len(TLabels[t]), dtype=np.bool_)
+                future_taken[cols] = True
+                unmatched = np.flatnonzero(~future_taken).tolist()
+                for j in unmatched:
+                    FinalLabels[t].append(labmax+1)
+                    labmax+=1
+                    FinalOutlines[t].append(TOutlines[t][j])
+                # Centers in the order of the final labels. Scaled, they are the past ones of the next frame
+                order = cols + unmatched
+                FinalCenters.append(TCenters[t][order])
+                prev = curr[order]
+                # Segmentation label and final label of every cell, as a (cells, 2) array
+                corr = np.empty((len(order), 2), dtype=np.int32)
+                corr[:,0] = np.asarray(TLabels[t], dtype=np.int32)[order]
+                corr[:,1] = FinalLabels[t]
+                self.label_correspondance[t] = corr
                 
         self.FinalLabels   = FinalLabels
         self.FinalCenters  = FinalCenters
         self.FinalOutlines = FinalOutlines
 
+    def _dists_matrix(self, N, M):
+        # Contiguous (N, M) view of a buffer reused by every frame. It grows by doubling when needed.
+        if len(self._Dists_buf) < N*M:
+            self._Dists_buf = np.empty(max(N*M, 2*len(self._Dists_buf)), dtype=np.float32)
+        return self._Dists_buf[:N*M].reshape(N, M)
+
     def init_cells(self):
         self.currentcellid = 0
         self.unique_labels = np.unique(np.hstack(self.FinalLabels))
         self.max_label = int(max(self.unique_labels))
         self.cells = []
+        # Segmentation label of every final label, and index of every label in its plane, at each time
+        corr_index  = [{l: _l for _l, l in reversed(corr.tolist())} for corr in self.label_correspondance]
+        label_index = [[{l: i for i, l in enumerate(labs)} for labs in _labels] for _labels in self._labels]
         for lab in self.unique_labels:
             OUTLINES = []
             MASKS    = []
             TIMES    = []
             ZS       = []
             for t in range(self.times):
-                if lab in self.FinalLabels[t]:
+                if lab in corr_index[t]:
                     TIMES.append(t)
-                    idd  = np.where(np.array(self.label_correspondance[t])[:,1]==lab)[0][0]
-                    _lab = self.label_correspondance[t][idd][0]
-                    _labid = self._Zlabel_ls[t].index(_lab)
+                    _lab = corr_index[t][lab]
+                    _labid = self._Zlabel_idxs[t][_lab]
                     ZS.append(self._Zlabel_zs[t][_labid])
                     OUTLINES.append([])
                     MASKS.append([])
                     for z in ZS[-1]:
-                        id_l = np.where(np.array(self._labels[t][z])==_lab)[0][0]
+                        id_l = label_index[t][z][_lab]
                         OUTLINES[-1].append(self._Outlines[t][z][id_l])
                         MASKS[-1].append(self._Masks[t][z][id_l])
             self.cells.append(Cell(self.currentcellid, lab, ZS, TIMES, OUTLINES, MASKS, self))
@@ -1095,6 +1359,10 @@ class CellTracking(object):
         self._extract_unique_labels_per_time()
 
     def _update_CT_cell_attributes(self):
+            # The cell lookups of the masks and the outlines to plot are rebuilt from the new cells when needed
+            self._mask_lookup = {}
+            self._outlines_plot_cache = {}
+            self._label_to_cell = {cell.label: cell for cell in self.cells}
             self.Labels   = []
             self.Outlines = []
             self.Masks    = []
@@ -1121,20 +1389,45 @@ class CellTracking(object):
                         self.Centersi[t][z].append(cell.centersi[tid][zid])
                         self.Centersj[t][z].append(cell.centersj[tid][zid])
     
+    def _cell_at(self, t, z, x, y):
+        # Index of the cell whose mask contains the point (x, y) at time t and plane z, None if there is none.
+        # The label image of each plane holds the index of the cell of every pixel (-1 for background)
+        # and is built the first time it is needed.
+        if (t, z) not in self._mask_lookup:
+            label_image = np.full(self.stack_dims, -1, dtype=np.int32)
+            H, W = label_image.shape
+            # Reversed so that the first cell wins where masks overlap
+            for i in reversed(range(len(self.Masks[t][z]))):
+                mask = self.Masks[t][z][i]
+                # Hand drawn cells can reach beyond the image borders
+                inside = (mask[:,0] >= 0) & (mask[:,0] < W) & (mask[:,1] >= 0) & (mask[:,1] < H)
+                label_image[mask[inside,1], mask[inside,0]] = i
+            self._mask_lookup[(t, z)] = label_image
+        label_image = self._mask_lookup[(t, z)]
+        x = int(x)
+        y = int(y)
+        if not (0 <= y < label_image.shape[0] and 0 <= x < label_image.shape[1]):
+            return None
+        i = int(label_image[y, x])
+        if i < 0:
+            return None
+        return i
+
     def _sort_point_sequence(self, outline):
         min_dists, min_dist_idx = cKDTree(outline).query(outline,self._nearest_neighs)
-        min_dists = min_dists[:,1:]
         min_dist_idx = min_dist_idx[:,1:]
-        new_outline = []
-        used_idxs   = []
-        pidx = random.choice(range(len(outline)))
-        new_outline.append(outline[pidx])
+        used      = np.zeros(len(outline), dtype=np.bool_)
+        used_idxs = []
+        # Start the walk at the leftmost point
+        pidx = int(np.argmin(outline[:,0]))
+        used[pidx] = True
         used_idxs.append(pidx)
-        while len(new_outline)<len(outline):
+        while len(used_idxs)<len(outline):
             a = len(used_idxs)
             for id in min_dist_idx[pidx,:]:
-                if id not in used_idxs:
-                    new_outline.append(outline[id])
+                # Missing neighbors are returned with index len(outline)
+                if id<len(outline) and not used[id]:
+                    used[id] = True
                     used_idxs.append(id)
                     pidx=id
                     break
@@ -1142,55 +1435,15 @@ class CellTracking(object):
                 self.printfancy("Improve your point drawing, this is a bit embarrasing") 
                 self.PACT.visualization()
                 return
-        return np.array(new_outline), used_idxs
+        return outline[used_idxs], used_idxs
 
     def _increase_point_resolution(self, outline):
-        rounds = np.ceil(np.log2(self._min_outline_length/len(outline))).astype('int32')
-        if rounds==0:
-                newoutline_new=np.copy(outline)
-        for r in range(rounds):
-            if r==0:
-                pre_outline=np.copy(outline)
-            else:
-                pre_outline=np.copy(newoutline_new)
-            newoutline_new = np.copy(pre_outline)
-            i=0
-            while i < len(pre_outline)*2 - 2:
-                newpoint = np.array([np.rint((newoutline_new[i] + newoutline_new[i+1])/2).astype('int32')])
-                newoutline_new = np.insert(newoutline_new, i+1, newpoint, axis=0)
-                i+=2
-            newpoint = np.array([np.rint((pre_outline[-1] + pre_outline[0])/2).astype('int32')])
-            newoutline_new = np.insert(newoutline_new, 0, newpoint, axis=0)
-
-        return newoutline_new
+        return increase_point_resolution(outline, self._min_outline_length)
     
     def _points_within_hull(self, hull):
         # With this function we compute the points contained within a hull or outline.
-        pointsinside=[]
-        sortidx = np.argsort(hull[:,1])
-        outx = hull[:,0][sortidx]
-        outy = hull[:,1][sortidx]
-        curry = outy[0]
-        minx = np.iinfo(np.int32).max
-        maxx = 0
-        for j,y in enumerate(outy):
-            done=False
-            while not done:
-                if y==curry:
-                    minx = np.minimum(minx, outx[j])
-                    maxx = np.maximum(maxx, outx[j])
-                    done=True
-                    curry=y
-                else:
-                    for x in range(minx, maxx+1):
-                        pointsinside.append([x, curry])
-                    minx = np.iinfo(np.int32).max
-                    maxx = 0
-                    curry= y
-
-        pointsinside=np.array(pointsinside)
-        return pointsinside
-    
+        return points_within_hull(hull)
+
     def add_cell(self, PACT):
         line, = PACT.ax_sel.plot([], [], linestyle="none", marker="o", color="r", markersize=2)
         self.linebuilder = LineBuilder(line)
@@ -1213,27 +1466,27 @@ class CellTracking(object):
 
     def delete_cell(self, PACT):
         cells = [x[0] for x in PACT.list_of_cells]
-        cellids = []
         Zs    = [x[1] for x in PACT.list_of_cells]
         if len(cells) == 0:
             return
-        for i,lab in enumerate(cells):
-            z=Zs[i]
-            cell  = self._get_cell(lab)
-            cellids.append(cell.id)
+        # Planes to remove of each cell, so that the lists of every cell are rebuilt and updated once
+        zs_by_lab = {}
+        for lab, z in zip(cells, Zs):
+            zs_by_lab.setdefault(lab, set()).add(z)
+        kept_cells = []
+        for lab, zs in zs_by_lab.items():
+            cell  = self._label_to_cell[lab]
             tid   = cell.times.index(PACT.t)
-            idrem = cell.zs[tid].index(z)
-            cell.zs[tid].pop(idrem)
-            cell.outlines[tid].pop(idrem)
-            cell.masks[tid].pop(idrem)
+            keep  = [z not in zs for z in cell.zs[tid]]
+            cell.zs[tid]       = list(itertools.compress(cell.zs[tid], keep))
+            cell.outlines[tid] = list(itertools.compress(cell.outlines[tid], keep))
+            cell.masks[tid]    = list(itertools.compress(cell.masks[tid], keep))
             cell._update(self)
             if cell._rem:
-                idrem = cell.id
-                cellids.remove(idrem)
                 self._del_cell(lab)
-        for i,cellid in enumerate(np.unique(cellids)):
-            z=Zs[i]
-            cell  = self._get_cell(cellid=cellid)
+            else:
+                kept_cells.append(cell)
+        for cell in kept_cells:
             try: cell.find_z_discontinuities(self, PACT.t)
             except ValueError: pass
         self.update_labels()
@@ -1313,7 +1566,7 @@ class CellTracking(object):
             return
 
         cell = self._get_cell(cells[0])
-        new_cell = deepcopy(cell)
+        new_cell = cell._copy()
         
         border=cell.times.index(max(Ts))
 
@@ -1374,14 +1627,74 @@ class CellTracking(object):
         title = _ax.set_title("z = %d" %z)
         self._titles[pactid].append(title)
         _ = _ax.axis(False)
-        Outlines = self.Outlines[t][z]
-        if plot_outlines:
-            for cell, outline in enumerate(Outlines):
-                label = self.Labels[t][z][cell]
-                out_plot = _ax.scatter(outline[:,0], outline[:,1], c=[self._masks_colors[self._labels_color_id[label]]], s=0.5, cmap=self._masks_cmap_name)               
-                self._outline_scatters[pactid].append(out_plot)
+        # The outlines of each axis are a single scatter that is updated on every replot
+        out_plot = _ax.scatter([], [], s=0.5)
+        self._set_outline_scatter(out_plot, t, z, plot_outlines=plot_outlines)
+        self._outline_scatters[pactid].append(out_plot)
+        # The same for the markers of the cell centers
+        pos_plot = _ax.scatter([], [], s=1.0, c="white")
+        self._pos_scatters[pactid].append(pos_plot)
+
+    def _outlines_to_plot(self, t, z):
+        # Points of all the outlines of plane z at time t as a single array, together with the color of each point.
+        # They are computed the first time the plane is plotted and kept until the cells change.
+        if (t, z) not in self._outlines_plot_cache:
+            Outlines = self.Outlines[t][z]
+            if len(Outlines)==0:
+                outlines_xy     = np.empty((0,2), dtype=np.float32)
+                outlines_colors = None
+            else:
+                lengths = [len(outline) for outline in Outlines]
+                colors  = self._label_rgba[self.Labels[t][z]]
+                outlines_xy     = np.concatenate(Outlines).astype(np.float32)
+                outlines_colors = np.repeat(colors, lengths, axis=0)
+            self._outlines_plot_cache[(t, z)] = (outlines_xy, outlines_colors)
+        return self._outlines_plot_cache[(t, z)]
+
+    def _set_outline_scatter(self, out_plot, t, z, plot_outlines=True):
+        if z is None or not plot_outlines:
+            out_plot.set_offsets(np.empty((0,2)))
+            return
+        outlines_xy, outlines_colors = self._outlines_to_plot(t, z)
+        out_plot.set_offsets(outlines_xy)
+        if len(outlines_xy)!=0:
+            out_plot.set_facecolor(outlines_colors)
+
+    def _display_stacks(self):
+        # Stacks as contiguous uint8, clipped to the same 0-255 window used by imshow.
+        # They are computed once so that the images are not converted again on every redraw.
+        if self._stacks_u8 is None:
+            stacks = np.asarray(self.stacks)
+            if stacks.dtype == np.uint8:
+                self._stacks_u8 = np.ascontiguousarray(stacks)
+            else:
+                # Clipped one time at a time into a reused buffer, so no full size copy of the stacks is made
+                self._stacks_u8 = np.empty(stacks.shape, dtype=np.uint8)
+                buf = np.empty(stacks.shape[1:], dtype=stacks.dtype)
+                for t in range(stacks.shape[0]):
+                    np.clip(stacks[t], 0, 255, out=buf)
+                    self._stacks_u8[t] = buf
+        return self._stacks_u8
+
+    def _set_pos_scatter(self, pos_plot, xys, sizes, colors):
+        if len(xys)==0:
+            pos_plot.set_offsets(np.empty((0,2)))
+            return
+        pos_plot.set_offsets(xys)
+        pos_plot.set_sizes(sizes)
+        pos_plot.set_facecolor(colors)
+
+    def _plot_round(self, round):
+        # Counter of a plot round with the z and the subplot of each of its spots, as lists.
+        # The layout does not change, so every round is computed once.
+        if round not in self._round_cache:
+            counter = plotRound(layout=self.plot_layout,totalsize=self.slices, overlap=self.plot_overlap, round=round)
+            zs, ids, _ = counter.arrays()
+            self._round_cache[round] = (counter, zs.tolist(), ids.tolist())
+        return self._round_cache[round]
 
     def plot_tracking(self, windows=None, cell_movement=False):
+        import matplotlib.pyplot as plt
         if windows==None:
             windows=self.plot_tracking_windows
         self.PACTs=[]
@@ -1395,46 +1708,49 @@ class CellTracking(object):
 
         if cell_movement: windows=1
         for w in range(windows):
-            counter = plotRound(layout=self.plot_layout,totalsize=self.slices, overlap=self.plot_overlap, round=0)
+            counter, zs, ids = self._plot_round(0)
             fig, ax = plt.subplots(counter.layout[0],counter.layout[1], figsize=(10,10))
             if cell_movement: self.PACTs.append(PlotActionCellMovement(fig, ax, self, w))
             else: self.PACTs.append(PlotActionCT(fig, ax, self, w))
             self.PACTs[w].zs = np.zeros_like(ax)
-            zidxs  = np.unravel_index(range(counter.groupsize), counter.layout)
+            # Axes in layout order, the same for 1D and 2D layouts
+            axes = np.asarray(ax).ravel()
             t=0
-            imgs   = self.stacks[t,:,:,:]
+            imgs   = self._display_stacks()[t]
 
             self._imshows.append([])
             self._titles.append([])
             self._outline_scatters.append([])
             self._pos_scatters.append([])
-            self._annotations.append([])
+            # The label annotations of each subplot are kept and updated on every replot
+            self._annotations.append([[] for id in ids])
 
             # Plot all our Zs in the corresponding round
-            for z, id, round in counter:
+            for z, id in zip(zs, ids):
                 # select current z plane
-                idx1 = zidxs[0][id]
-                idx2 = zidxs[1][id]
-                ax[idx1,idx2].axis(False)
-                if z == None:
+                axes[id].axis(False)
+                if z == -1:
                     pass
                 else:      
                     img = imgs[z,:,:]
-                    self.PACTs[w].zs[idx1, idx2] = z
-                    self.plot_axis(ax[idx1, idx2], img, z, w, t)
+                    self.PACTs[w].zs.flat[id] = z
+                    self.plot_axis(axes[id], img, z, w, t)
                     labs = self.Labels[t][z]
                     
+                    labs_z = []
+                    xy_z   = []
                     for lab in labs:
-                        cell = self._get_cell(lab)
+                        cell = self._label_to_cell[lab]
                         tid = cell.times.index(t)
                         zz, ys, xs = cell.centers[tid]
                         if zz == z:
-                            pos = ax[idx1, idx2].scatter([ys], [xs], s=1.0, c="white")
-                            self._pos_scatters[w].append(pos)
-                            ano = ax[idx1, idx2].annotate(str(lab), xy=(ys, xs), c="white")
-                            self._annotations[w].append(ano)
-                            _ = ax[idx1, idx2].set_xticks([])
-                            _ = ax[idx1, idx2].set_yticks([])
+                            labs_z.append(lab)
+                            xy_z.append((ys, xs))
+                    if len(labs_z)!=0:
+                        _ = axes[id].set_xticks([])
+                        _ = axes[id].set_yticks([])
+                    self._set_pos_scatter(self._pos_scatters[w][id], xy_z, [1.0]*len(xy_z), ["white"]*len(xy_z))
+                    self._set_annotations(axes[id], self._annotations[w][id], labs_z, xy_z)
                             
             plt.subplots_adjust(bottom=0.075)
             # Make a horizontal slider to control the frequency.
@@ -1454,70 +1770,89 @@ class CellTracking(object):
             self._time_sliders[w].on_changed(self.PACTs[w].update_slider)
         plt.show()
 
+    def _set_annotations(self, _ax, annotations, labs, xys):
+        # Move the existing label annotations of an axis to the new labels,
+        # creating new ones only when there are more labels than before and hiding the rest.
+        for i, lab in enumerate(labs):
+            if i < len(annotations):
+                annotations[i].set_text(str(lab))
+                annotations[i].xy = xys[i]
+                annotations[i].set_position(xys[i])
+                annotations[i].set_visible(True)
+            else:
+                annotations.append(_ax.annotate(str(lab), xy=xys[i], c="white"))
+        for ano in annotations[len(labs):]:
+            ano.set_visible(False)
+
     def replot_axis(self, _ax, img, z, t, pactid, imid, plot_outlines=True):
             self._imshows[pactid][imid].set_data(img)
             self._titles[pactid][imid].set_text("z = %d" %z)
-            Outlines = self.Outlines[t][z]
-            if plot_outlines:
-                for cell, outline in enumerate(Outlines):
-                    label = self.Labels[t][z][cell]
-                    out_plot = _ax.scatter(outline[:,0], outline[:,1], c=[self._masks_colors[self._labels_color_id[label]]], s=0.5, cmap=self._masks_cmap_name)               
-                    self._outline_scatters[pactid].append(out_plot)
+            self._set_outline_scatter(self._outline_scatters[pactid][imid], t, z, plot_outlines=plot_outlines)
                     
     def replot_tracking(self, PACT, plot_outlines=True):
+        import matplotlib.pyplot as plt
         t = PACT.t
         pactid = PACT.id
-        counter = plotRound(layout=self.plot_layout,totalsize=self.slices, overlap=self.plot_overlap, round=PACT.cr)
-        zidxs  = np.unravel_index(range(counter.groupsize), counter.layout)
-        imgs   = self.stacks[t,:,:,:]
+        _, zs, ids = self._plot_round(PACT.cr)
+        axes = np.asarray(PACT.ax).ravel()
+        imgs   = self._display_stacks()[t]
+        # Labels with apoptotic and mitotic events at this time, built once for all the planes
+        apo_labs  = {lab for lab, _t in self.apoptotic_events if _t==t}
+        mito_labs = {}
+        for mitoev in self.mitotic_events:
+            for lab, _t in mitoev:
+                if _t==t:
+                    mito_labs[lab] = mito_labs.get(lab, 0) + 1
         # Plot all our Zs in the corresponding round
-        for sc in self._outline_scatters[pactid]:
-            sc.remove()
-        for sc in self._pos_scatters[pactid]:
-            sc.remove()
-        for ano in self._annotations[pactid]:
-            ano.remove()
-        self._outline_scatters[pactid] = []
-        self._pos_scatters[pactid]     = []
-        self._annotations[pactid]      = []
-        for z, id, r in counter:
+        for z, id in zip(zs, ids):
             # select current z plane
-            idx1 = zidxs[0][id]
-            idx2 = zidxs[1][id]
-            if z == None:
-                img = np.zeros(self.stack_dims)
+            if z == -1:
+                img = np.zeros(self.stack_dims, dtype=np.uint8)
                 self._imshows[pactid][id].set_data(img)
                 self._titles[pactid][id].set_text("")
+                self._set_outline_scatter(self._outline_scatters[pactid][id], t, None)
+                self._set_pos_scatter(self._pos_scatters[pactid][id], [], [], [])
+                self._set_annotations(axes[id], self._annotations[pactid][id], [], [])
             else:      
                 img = imgs[z,:,:]
-                PACT.zs[idx1, idx2] = z
+                PACT.zs.flat[id] = z
                 labs = self.Labels[t][z]
-                self.replot_axis(PACT.ax[idx1, idx2], img, z, t, pactid, id, plot_outlines=plot_outlines)
+                self.replot_axis(axes[id], img, z, t, pactid, id, plot_outlines=plot_outlines)
+                labs_z = []
+                xy_z   = []
+                # Markers of the centers and of the events, drawn in this order
+                pos_xy     = []
+                pos_sizes  = []
+                pos_colors = []
                 for lab in labs:
-                    cell = self._get_cell(lab)
+                    cell = self._label_to_cell[lab]
                     tid = cell.times.index(t)
                     zz, ys, xs = cell.centers[tid]
                     if zz == z:
-                        if [lab, PACT.t] in self.apoptotic_events:
-                            _ = PACT.ax[idx1, idx2].scatter([ys], [xs], s=5.0, c="k")
-                            self._pos_scatters[pactid].append(_)
+                        pos_xy.append((ys, xs))
+                        if lab in apo_labs:
+                            pos_sizes.append(5.0)
+                            pos_colors.append("k")
                         else:
-                            _ = PACT.ax[idx1, idx2].scatter([ys], [xs], s=1.0, c="white")
-                            self._pos_scatters[pactid].append(_)
-                        anno = PACT.ax[idx1, idx2].annotate(str(lab), xy=(ys, xs), c="white")
-                        self._annotations[pactid].append(anno)              
+                            pos_sizes.append(1.0)
+                            pos_colors.append("white")
+                        labs_z.append(lab)
+                        xy_z.append((ys, xs))
                         
-                        for mitoev in self.mitotic_events:
-                            for cell in mitoev:
-                                if [lab, PACT.t]==cell:
-                                    _ = PACT.ax[idx1, idx2].scatter([ys], [xs], s=5.0, c="red")
-                                    self._pos_scatters[pactid].append(_)
+                        for _ in range(mito_labs.get(lab, 0)):
+                            pos_xy.append((ys, xs))
+                            pos_sizes.append(5.0)
+                            pos_colors.append("red")
+                self._set_pos_scatter(self._pos_scatters[pactid][id], pos_xy, pos_sizes, pos_colors)
+                self._set_annotations(axes[id], self._annotations[pactid][id], labs_z, xy_z)
 
         plt.subplots_adjust(bottom=0.075)
 
     def _assign_color_to_label(self):
         coloriter = itertools.cycle([i for i in range(len(self._masks_colors))])
         self._labels_color_id = [next(coloriter) for i in range(1000)]
+        # RGBA color of every label
+        self._label_rgba = to_rgba_array(self._masks_colors).astype(np.float32)[self._labels_color_id]
     
     def compute_cell_movement(self):
         for cell in self.cells:
@@ -1541,6 +1876,7 @@ class CellTracking(object):
             cell.disp = new_disp
 
     def plot_cell_movement(self, label_list=None, plot_mean=True, plot_tracking=True, substract_mean=None):
+        import matplotlib.pyplot as plt
         if substract_mean is None: substract_mean=self._mscm
 
         self.compute_cell_movement()
@@ -1640,6 +1976,10 @@ class PlotActionCT:
         self.zs=[]
         self.z = None
         self.scl = fig.canvas.mpl_connect('scroll_event', self.onscroll)
+        # Position in the layout of each subplot
+        self._ax_to_idx = {_ax: k for k, _ax in enumerate(np.asarray(ax).ravel())}
+        self._subplot_bboxes = None
+        self.rsz = fig.canvas.mpl_connect('resize_event', self._on_resize)
         groupsize  = self.CT.plot_layout[0] * self.CT.plot_layout[1]
         self.max_round =  math.ceil((self.CT.slices)/(groupsize-self.CT.plot_overlap))-1
         self.get_size()
@@ -1650,8 +1990,18 @@ class PlotActionCT:
         self.instructions = self.fig.text(0.4, 0.98, "PRESS ENTER TO START", fontsize=1, ha='left', va='top', bbox=dict(facecolor='black', alpha=0.4, edgecolor='black', pad=2))
         self.selected_cells = self.fig.text(0.98, 0.89, "Cell\nSelection", fontsize=1, ha='right', va='top')
         self.plot_outlines=True
+        self._set_fontsizes()
         self.update()
 
+    def _select_subplot(self, event):
+        # Select the subplot where the event happened, if any, through the axes table.
+        k = self._ax_to_idx.get(event.inaxes)
+        if k is None:
+            return
+        self.current_subplot = [int(i) for i in np.unravel_index(k, self.ax.shape)]
+        self.ax_sel = self.ax.flat[k]
+        self.z = self.zs.flat[k]
+
     def on_key_press(self, event):
         if event.key == 'control':
             self.ctrl_is_held = True
@@ -1711,7 +2061,7 @@ class PlotActionCT:
             if event.key=='escape':
                 if self.current_state=="add":
                     if hasattr(self, 'patch'):
-                        self.patch.set_visible(False)
+                        self.patch.remove()
                         delattr(self, 'patch')
                     self.CT.linebuilder.stopit()
                 else:
@@ -1736,7 +2086,7 @@ class PlotActionCT:
                     if self.current_subplot==None:
                         pass
                     else:
-                        self.patch.set_visible(False)
+                        self.patch.remove()
                         delattr(self, 'patch')
                         self.CT.complete_add_cell(self)
                         self.CT.update_labels()
@@ -1883,6 +2233,7 @@ class PlotActionCT:
                 self.current_state=None
 
     def update(self):
+        import matplotlib.pyplot as plt
         if self.current_state in ["apo","Com", "mit", "Sep"]:
             if self.current_state=="Sep": cells_to_plot = self.CT.list_of_cells
             else: cells_to_plot=self.extract_unique_cell_time_list_of_cells()
@@ -1893,24 +2244,10 @@ class PlotActionCT:
                 cells_to_plot[i][0] = x[0]
             cells_string = ["cell="+str(x[0])+" z="+str(x[1]) for x in cells_to_plot]
         s = "\n".join(cells_string)
-        self.get_size()
-        if self.figheight < self.figwidth:
-            width_or_height = self.figheight
-            scale1=110
-            scale2=90
-        else:
-            scale1=110
-            scale2=90
-            width_or_height = self.figwidth
-        self.actionlist.set(fontsize=width_or_height/scale1)
-        self.selected_cells.set(fontsize=width_or_height/scale1)
         self.selected_cells.set(text="Cells\nSelected\n\n"+s)
-        self.instructions.set(fontsize=width_or_height/scale2)
-        self.timetxt.set(text="TIME = {timem} min  ({t}/{tt})".format(timem = self.CT._tstep*self.t, t=self.t, tt=self.CT.times-1), fontsize=width_or_height/scale2)
-        self.title.set(fontsize=width_or_height/scale2)
+        self.timetxt.set(text="TIME = {timem} min  ({t}/{tt})".format(timem = self.CT._tstep*self.t, t=self.t, tt=self.CT.times-1))
         plt.subplots_adjust(top=0.9,left=0.2)
         self.fig.canvas.draw_idle()
-        self.fig.canvas.draw()
 
     def add_cells(self):
         self.title.set(text="ADD CELL\nMODE", ha='left', x=0.01)
@@ -1924,13 +2261,12 @@ class PlotActionCT:
                 else:
                     i = self.current_subplot
                     self.ax_sel = self.ax[i]
-                    bbox = self.ax_sel.get_window_extent()
+                    bbox = self._subplot_bbox(self.ax_sel)
                     self.patch =mtp.patches.Rectangle((bbox.x0 - bbox.width*0.1, bbox.y0-bbox.height*0.1),
                                         bbox.width*1.2, bbox.height*1.2,
                                         fill=True, color=(0.0,1.0,0.0), alpha=0.4, zorder=1000,
                                         transform=None, figure=self.fig)
-                    self.fig.patches.extend([self.patch])
-                    #self.ax_sel.add_patch(self.patch)
+                    self.fig.add_artist(self.patch)
                     self.instructions.set_backgroundcolor((0.0,1.0,0.0,0.4))
                     self.instructions.set(text="Right click to add points. Press ENTER when finished")
                     self.update()
@@ -1944,16 +2280,43 @@ class PlotActionCT:
                     i = self.current_subplot[0]
                     j = self.current_subplot[1]
                     self.ax_sel = self.ax[i,j]
-                    bbox = self.ax_sel.get_window_extent()
+                    bbox = self._subplot_bbox(self.ax_sel)
                     self.patch =mtp.patches.Rectangle((bbox.x0 - bbox.width*0.1, bbox.y0-bbox.height*0.1),
                                         bbox.width*1.2, bbox.height*1.2,
                                         fill=True, color=(0.0,1.0,0.0), alpha=0.4, zorder=-1,
                                         transform=None, figure=self.fig)
-                    self.fig.patches.extend([self.patch])
+                    self.fig.add_artist(self.patch)
                     self.instructions.set(text="Right click to add points. Press ENTER when finished")
                     self.instructions.set_backgroundcolor((0.0,1.0,0.0,0.4))
                     self.update()
 
+    def _subplot_bbox(self, ax):
+        # Window extents of the subplots. They are computed once and only change when the figure is resized.
+        if self._subplot_bboxes is None:
+            self._subplot_bboxes = {_ax: _ax.get_window_extent() for _ax in np.asarray(self.ax).ravel()}
+        return self._subplot_bboxes[ax]
+
+    def _on_resize(self, event):
+        self._subplot_bboxes = None
+        self._set_fontsizes()
+
+    def _set_fontsizes(self):
+        # Font sizes follow the figure size, so they only need to be set again when the figure is resized
+        self.get_size()
+        if self.figheight < self.figwidth:
+            width_or_height = self.figheight
+            scale1=110
+            scale2=90
+        else:
+            scale1=110
+            scale2=90
+            width_or_height = self.figwidth
+        self.actionlist.set(fontsize=width_or_height/scale1)
+        self.selected_cells.set(fontsize=width_or_height/scale1)
+        self.instructions.set(fontsize=width_or_height/scale2)
+        self.timetxt.set(fontsize=width_or_height/scale2)
+        self.title.set(fontsize=width_or_height/scale2)
+
     def extract_unique_cell_time_list_of_cells(self):
         if self.current_state in ["Com", "Sep"]:
             list_of_cells=self.CT.list_of_cells
@@ -1976,23 +2339,10 @@ class PlotActionCT:
         if len(self.list_of_cells)==0:
             return self.list_of_cells
         else:
-            cells = [x[0] for x in self.list_of_cells]
-            Zs    = [x[1] for x in self.list_of_cells]
-            cidxs  = np.argsort(cells)
-            cells = np.array(cells)[cidxs]
-            Zs    = np.array(Zs)[cidxs]
-
-            ucells = np.unique(cells)
-            final_cells = []
-            for c in ucells:
-                ids = np.where(cells == c)
-                _cells = cells[ids]
-                _Zs    = Zs[ids]
-                zidxs = np.argsort(_Zs)
-                for id in zidxs:
-                    final_cells.append([_cells[id], _Zs[id]])
-
-            return final_cells
+            # Sort by cell and then by z in a single pass
+            cells = np.array([x[0:2] for x in self.list_of_cells], dtype=np.int64)
+            order = np.lexsort((cells[:,1], cells[:,0]))
+            return cells[order].tolist()
 
     def get_size(self):
         bboxfig = self.fig.get_window_extent().transformed(self.fig.dpi_scale_trans.inverted())
@@ -2060,30 +2410,43 @@ class SubplotPicker_add():
     def __call__(self, event):
         if event.dblclick == True:
             if event.button==1:
-                if len(self.axshape)==1:
-                    for i in range(self.axshape[0]):
-                        if event.inaxes==self.PACT.ax[i]:
-                            self.PACT.current_subplot = i
-                            self.PACT.z = self.PACT.zs[i]
-                            self.canvas.mpl_disconnect(self.cid)
-                            self.PACT.add_cells()
-                            self.PACT.CT.add_cell(self.PACT)
-                else:
-                    for i in range(self.axshape[0]):
-                        for j in range(self.axshape[1]):
-                                if event.inaxes==self.PACT.ax[i,j]:
-                                    self.PACT.current_subplot = [i,j]
-                                    self.PACT.z = self.PACT.zs[i,j]
-                                    self.canvas.mpl_disconnect(self.cid)
-                                    self.PACT.add_cells()
-                                    self.PACT.CT.add_cell(self.PACT)
+                k = self.PACT._ax_to_idx.get(event.inaxes)
+                if k is not None:
+                    if len(self.axshape)==1:
+                        self.PACT.current_subplot = k
+                    else:
+                        self.PACT.current_subplot = [int(i) for i in np.unravel_index(k, self.axshape)]
+                    self.PACT.z = self.PACT.zs.flat[k]
+                    self.canvas.mpl_disconnect(self.cid)
+                    self.PACT.add_cells()
+                    self.PACT.CT.add_cell(self.PACT)
 
 class LineBuilder:
     def __init__(self, line):
         self.line = line
-        self.xs = list(line.get_xdata())
-        self.ys = list(line.get_ydata())
-        self.cid = line.figure.canvas.mpl_connect('button_press_event', self)
+        # Points of the line, stored in a buffer that doubles its size when it is full
+        xs = line.get_xdata()
+        ys = line.get_ydata()
+        self._n   = len(xs)
+        self._pts = np.empty((max(64, 2*self._n), 2), dtype=np.float32)
+        self._pts[:self._n,0] = xs
+        self._pts[:self._n,1] = ys
+        self.canvas = line.figure.canvas
+        self.background = None
+        self.cid = self.canvas.mpl_connect('button_press_event', self)
+        self.did = self.canvas.mpl_connect('draw_event', self.on_draw)
+
+    @property
+    def xs(self):
+        return self._pts[:self._n,0]
+
+    @property
+    def ys(self):
+        return self._pts[:self._n,1]
+
+    def on_draw(self, event):
+        # Axes as drawn on the last full draw, over which the new points are blitted
+        self.background = self.canvas.copy_from_bbox(self.line.axes.bbox)
 
     def __call__(self, event):
         if event.inaxes!=self.line.axes: 
@@ -2092,14 +2455,22 @@ class LineBuilder:
             if self.line.figure.canvas.toolbar.mode!="":
                 self.line.figure.canvas.mpl_disconnect(self.line.figure.canvas.toolbar._zoom_info.cid)
                 self.line.figure.canvas.toolbar.zoom()
-            self.xs.append(event.xdata)
-            self.ys.append(event.ydata)
+            if self._n==len(self._pts):
+                self._pts = np.concatenate([self._pts, np.empty_like(self._pts)])
+            self._pts[self._n] = event.xdata, event.ydata
+            self._n += 1
             self.line.set_data(self.xs, self.ys)
-            self.line.figure.canvas.draw()
+            if self.background is None or not self.canvas.supports_blit:
+                self.canvas.draw_idle()
+            else:
+                self.canvas.restore_region(self.background)
+                self.line.axes.draw_artist(self.line)
+                self.canvas.blit(self.line.axes.bbox)
         else:
             return
     def stopit(self):
-        self.line.figure.canvas.mpl_disconnect(self.cid)
+        self.canvas.mpl_disconnect(self.cid)
+        self.canvas.mpl_disconnect(self.did)
         self.line.remove()
 
 class CellPicker_del():
@@ -2110,21 +2481,7 @@ class CellPicker_del():
     def __call__(self, event):
         if event.button==3:
             if isinstance(self.PACT.ax, np.ndarray):
-                axshape = self.PACT.ax.shape
-                # Select ax 
-                if len(axshape)==1:
-                    for i in range(axshape[0]):
-                        if event.inaxes==self.PACT.ax[i]:
-                            self.PACT.current_subplot = [i]
-                            self.PACT.ax_sel = self.PACT.ax[i]
-                            self.PACT.z = self.PACT.zs[i]
-                else:
-                    for i in range(axshape[0]):
-                            for j in range(axshape[1]):
-                                    if event.inaxes==self.PACT.ax[i,j]:
-                                        self.PACT.current_subplot = [i,j]
-                                        self.PACT.ax_sel = self.PACT.ax[i,j]
-                                        self.PACT.z = self.PACT.zs[i,j]
+                self.PACT._select_subplot(event)
             else:
                 self.PACT.ax_sel = self.PACT.ax
                 self.PACT.z = self.PACT.zs
@@ -2134,39 +2491,29 @@ class CellPicker_del():
             else:
                 x = np.rint(event.xdata).astype(np.int64)
                 y = np.rint(event.ydata).astype(np.int64)
-                picked_point = np.array([x, y])
-                for i ,mask in enumerate(self.PACT.CT.Masks[self.PACT.t][self.PACT.z]):
-                    for point in mask:
-                        if (picked_point==point).all():
-                            z   = self.PACT.z
-                            lab = self.PACT.CT.Labels[self.PACT.t][z][i]
-                            cell = [lab, z]
-                            if cell not in self.PACT.list_of_cells:
-                                self.PACT.list_of_cells.append(cell)
-                            else:
-                                self.PACT.list_of_cells.remove(cell)
-                            if event.dblclick==True:
-                                for id_cell, Cell in enumerate(self.PACT.CT.cells):
-                                    if lab == Cell.label:
-                                        idx_lab = id_cell 
-                                tcell = self.PACT.CT.cells[idx_lab].times.index(self.PACT.t)
-                                zs = self.PACT.CT.cells[idx_lab].zs[tcell]
-                                add_all=True
-                                idxtopop=[]
-                                for jj, _cell in enumerate(self.PACT.list_of_cells):
-                                    _lab = _cell[0]
-                                    _z   = _cell[1]
-                                    if _lab == lab:
-                                        if _z in zs:
-                                            add_all=False
-                                            idxtopop.append(jj)
-                                idxtopop.sort(reverse=True)
-                                for jj in idxtopop:
-                                    self.PACT.list_of_cells.pop(jj)
-                                if add_all:
-                                    for zz in zs:
-                                        self.PACT.list_of_cells.append([lab, zz])
-                            self.PACT.update()
+                i = self.PACT.CT._cell_at(self.PACT.t, self.PACT.z, x, y)
+                if i is not None:
+                    z   = self.PACT.z
+                    lab = self.PACT.CT.Labels[self.PACT.t][z][i]
+                    cell = [lab, z]
+                    if cell not in self.PACT.list_of_cells:
+                        self.PACT.list_of_cells.append(cell)
+                    else:
+                        self.PACT.list_of_cells.remove(cell)
+                    if event.dblclick==True:
+                        cell_lab = self.PACT.CT._label_to_cell[lab]
+                        tcell = cell_lab.times.index(self.PACT.t)
+                        zs = cell_lab.zs[tcell]
+                        zs_set = set(zs)
+                        idxtopop = [jj for jj, _cell in enumerate(self.PACT.list_of_cells) if _cell[0]==lab and _cell[1] in zs_set]
+                        add_all = len(idxtopop)==0
+                        idxtopop.reverse()
+                        for jj in idxtopop:
+                            self.PACT.list_of_cells.pop(jj)
+                        if add_all:
+                            for zz in zs:
+                                self.PACT.list_of_cells.append([lab, zz])
+                    self.PACT.update()
             # Select cell and store it   
 
     def stopit(self):
@@ -2180,21 +2527,7 @@ class CellPicker_com_z():
     def __call__(self, event):
         if event.button==3:
             if isinstance(self.PACT.ax, np.ndarray):
-                axshape = self.PACT.ax.shape
-                # Select ax 
-                if len(axshape)==1:
-                    for i in range(axshape[0]):
-                        if event.inaxes==self.PACT.ax[i]:
-                            self.PACT.current_subplot = [i]
-                            self.PACT.ax_sel = self.PACT.ax[i]
-                            self.PACT.z = self.PACT.zs[i]
-                else:
-                    for i in range(axshape[0]):
-                            for j in range(axshape[1]):
-                                    if event.inaxes==self.PACT.ax[i,j]:
-                                        self.PACT.current_subplot = [i,j]
-                                        self.PACT.ax_sel = self.PACT.ax[i,j]
-                                        self.PACT.z = self.PACT.zs[i,j]
+                self.PACT._select_subplot(event)
             else:
                 self.PACT.ax_sel = self.PACT.ax
 
@@ -2203,51 +2536,49 @@ class CellPicker_com_z():
             else:
                 x = np.rint(event.xdata).astype(np.int64)
                 y = np.rint(event.ydata).astype(np.int64)
-                picked_point = np.array([x, y])
-                for i ,mask in enumerate(self.PACT.CT.Masks[self.PACT.t][self.PACT.z]):
-                    for point in mask:
-                        if (picked_point==point).all():
-                            z   = self.PACT.z
-                            lab = self.PACT.CT.Labels[self.PACT.t][z][i]
-                            cell = [lab, z, self.PACT.t]
-
-                            if cell in self.PACT.list_of_cells:
-                                self.PACT.list_of_cells.remove(cell)
-                                self.PACT.update()
-                                return
-                            
-                            # Check that times match among selected cells
-                            if len(self.PACT.list_of_cells)!=0:
-                                if cell[2]!=self.PACT.list_of_cells[0][2]:
-                                    self.PACT.CT.printfancy("ERROR: cells must be selected on same time")
-                                    return 
-                                
-                                # check that planes selected are contiguous over z
-                                Zs = [x[1] for x in self.PACT.list_of_cells]
-                                Zs.append(z)
-                                Zs.sort()
-
-                                if any((Zs[i+1]-Zs[i])!=1 for i in range(len(Zs)-1)):
-                                    self.PACT.CT.printfancy("ERROR: cells must be contiguous over z")
-                                    return
-                                                                                                
-                                # check if cells have any overlap in their zs
-                                labs = [x[0] for x in self.PACT.list_of_cells]
-                                labs.append(lab)
-                                ZS = []
-                                t = self.PACT.t
-                                for l in labs:
-                                    c = self.PACT.CT._get_cell(l)
-                                    tid = c.times.index(t)
-                                    ZS = ZS + c.zs[tid]
-                                
-                                if len(ZS) != len(set(ZS)):
-                                    self.PACT.CT.printfancy("ERROR: cells overlap in z")
-                                    return
-                            
-                            # proceed with the selection
-                            self.PACT.list_of_cells.append(cell)
-                            self.PACT.update()
+                i = self.PACT.CT._cell_at(self.PACT.t, self.PACT.z, x, y)
+                if i is not None:
+                    z   = self.PACT.z
+                    lab = self.PACT.CT.Labels[self.PACT.t][z][i]
+                    cell = [lab, z, self.PACT.t]
+
+                    if cell in self.PACT.list_of_cells:
+                        self.PACT.list_of_cells.remove(cell)
+                        self.PACT.update()
+                        return
+
+                    # Check that times match among selected cells
+                    if len(self.PACT.list_of_cells)!=0:
+                        if cell[2]!=self.PACT.list_of_cells[0][2]:
+                            self.PACT.CT.printfancy("ERROR: cells must be selected on same time")
+                            return 
+
+                        # check that planes selected are contiguous over z
+                        Zs = [x[1] for x in self.PACT.list_of_cells]
+                        Zs.append(z)
+                        Zs.sort()
+
+                        if any((Zs[i+1]-Zs[i])!=1 for i in range(len(Zs)-1)):
+                            self.PACT.CT.printfancy("ERROR: cells must be contiguous over z")
+                            return
+
+                        # check if cells have any overlap in their zs
+                        labs = [x[0] for x in self.PACT.list_of_cells]
+                        labs.append(lab)
+                        ZS = []
+                        t = self.PACT.t
+                        for l in labs:
+                            c = self.PACT.CT._get_cell(l)
+                            tid = c.times.index(t)
+                            ZS = ZS + c.zs[tid]
+
+                        if len(ZS) != len(set(ZS)):
+                            self.PACT.CT.printfancy("ERROR: cells overlap in z")
+                            return
+
+                    # proceed with the selection
+                    self.PACT.list_of_cells.append(cell)
+                    self.PACT.update()
 
     def stopit(self):
         self.canvas.mpl_disconnect(self.cid)
@@ -2264,15 +2595,7 @@ class CellPicker_com_t():
 
             # Check if the figure is a 2D layout
             if isinstance(self.PACT.ax, np.ndarray):
-                axshape = self.PACT.ax.shape
-
-                # Get subplot of clicked point 
-                for i in range(axshape[0]):
-                        for j in range(axshape[1]):
-                                if event.inaxes==self.PACT.ax[i,j]:
-                                    self.PACT.current_subplot = [i,j]
-                                    self.PACT.ax_sel = self.PACT.ax[i,j]
-                                    self.PACT.z = self.PACT.zs[i,j]
+                self.PACT._select_subplot(event)
             else:
                 raise IndexError("Plot layout not supported")
 
@@ -2285,31 +2608,29 @@ class CellPicker_com_t():
                 # Get point coordinates
                 x = np.rint(event.xdata).astype(np.int64)
                 y = np.rint(event.ydata).astype(np.int64)
-                picked_point = np.array([x, y])
 
                 # Check if the point is inside the mask of any cell
-                for i ,mask in enumerate(self.PACT.CT.Masks[self.PACT.t][self.PACT.z]):
-                    for point in mask:
-                        if (picked_point==point).all():
-                            z   = self.PACT.z
-                            lab = self.PACT.CT.Labels[self.PACT.t][z][i]
-                            cell = [lab, self.PACT.t]
-                            # Check if the cell is already on the list
-                            if len(self.PACT.CT.list_of_cells)==0:
-                                self.PACT.CT.list_of_cells.append(cell)
+                i = self.PACT.CT._cell_at(self.PACT.t, self.PACT.z, x, y)
+                if i is not None:
+                    z   = self.PACT.z
+                    lab = self.PACT.CT.Labels[self.PACT.t][z][i]
+                    cell = [lab, self.PACT.t]
+                    # Check if the cell is already on the list
+                    if len(self.PACT.CT.list_of_cells)==0:
+                        self.PACT.CT.list_of_cells.append(cell)
+                    else:
+                        if lab not in np.array(self.PACT.CT.list_of_cells)[:,0]:
+                            if len(self.PACT.CT.list_of_cells)==2:
+                                self.PACT.CT.printfancy("ERROR: cannot combine more than 2 cells at once")
                             else:
-                                if lab not in np.array(self.PACT.CT.list_of_cells)[:,0]:
-                                    if len(self.PACT.CT.list_of_cells)==2:
-                                        self.PACT.CT.printfancy("ERROR: cannot combine more than 2 cells at once")
-                                    else:
-                                        if self.PACT.t not in np.array(self.PACT.CT.list_of_cells)[:,1]:
-                                            self.PACT.CT.list_of_cells.append(cell)
-                                else:
-                                    if cell in self.PACT.CT.list_of_cells: self.PACT.CT.list_of_cells.remove(cell)
-                                    else: self.PACT.CT.printfancy("ERROR: cannot combine a cell with itself")
-                            for PACT in self.PACT.CT.PACTs:
-                                if PACT.current_state=="Com":
-                                    PACT.update()
+                                if self.PACT.t not in np.array(self.PACT.CT.list_of_cells)[:,1]:
+                                    self.PACT.CT.list_of_cells.append(cell)
+                        else:
+                            if cell in self.PACT.CT.list_of_cells: self.PACT.CT.list_of_cells.remove(cell)
+                            else: self.PACT.CT.printfancy("ERROR: cannot combine a cell with itself")
+                    for PACT in self.PACT.CT.PACTs:
+                        if PACT.current_state=="Com":
+                            PACT.update()
 
     def stopit(self):
         
@@ -2328,15 +2649,7 @@ class CellPicker_sep_t():
 
             # Check if the figure is a 2D layout
             if isinstance(self.PACT.ax, np.ndarray):
-                axshape = self.PACT.ax.shape
-
-                # Get subplot of clicked point 
-                for i in range(axshape[0]):
-                        for j in range(axshape[1]):
-                                if event.inaxes==self.PACT.ax[i,j]:
-                                    self.PACT.current_subplot = [i,j]
-                                    self.PACT.ax_sel = self.PACT.ax[i,j]
-                                    self.PACT.z = self.PACT.zs[i,j]
+                self.PACT._select_subplot(event)
             else:
                 raise IndexError("Plot layout not supported")
 
@@ -2349,38 +2662,36 @@ class CellPicker_sep_t():
                 # Get point coordinates
                 x = np.rint(event.xdata).astype(np.int64)
                 y = np.rint(event.ydata).astype(np.int64)
-                picked_point = np.array([x, y])
 
                 # Check if the point is inside the mask of any cell
-                for i ,mask in enumerate(self.PACT.CT.Masks[self.PACT.t][self.PACT.z]):
-                    for point in mask:
-                        if (picked_point==point).all():
-                            z   = self.PACT.z
-                            lab = self.PACT.CT.Labels[self.PACT.t][z][i]
-                            cell = [lab, self.PACT.t]
-                            # Check if the cell is already on the list
-                            if len(self.PACT.CT.list_of_cells)==0:
-                                self.PACT.CT.list_of_cells.append(cell)
-                            
+                i = self.PACT.CT._cell_at(self.PACT.t, self.PACT.z, x, y)
+                if i is not None:
+                    z   = self.PACT.z
+                    lab = self.PACT.CT.Labels[self.PACT.t][z][i]
+                    cell = [lab, self.PACT.t]
+                    # Check if the cell is already on the list
+                    if len(self.PACT.CT.list_of_cells)==0:
+                        self.PACT.CT.list_of_cells.append(cell)
+
+                    else:
+
+                        if lab != self.PACT.CT.list_of_cells[0][0]:
+                            self.PACT.CT.printfancy("ERROR: select same cell at a different time")
+                            return
+
+                        else:
+                            if self.PACT.t in np.array(self.PACT.CT.list_of_cells)[:,1]:
+                                self.PACT.CT.list_of_cells.remove(cell)
                             else:
-                                
-                                if lab != self.PACT.CT.list_of_cells[0][0]:
-                                    self.PACT.CT.printfancy("ERROR: select same cell at a different time")
+                                if len(self.PACT.CT.list_of_cells)==2: 
+                                    self.PACT.CT.printfancy("ERROR: cannot separate more than 2 times at once")
                                     return
-                               
                                 else:
-                                    if self.PACT.t in np.array(self.PACT.CT.list_of_cells)[:,1]:
-                                        self.PACT.CT.list_of_cells.remove(cell)
-                                    else:
-                                        if len(self.PACT.CT.list_of_cells)==2: 
-                                            self.PACT.CT.printfancy("ERROR: cannot separate more than 2 times at once")
-                                            return
-                                        else:
-                                            self.PACT.CT.list_of_cells.append(cell)
-
-                            for PACT in self.PACT.CT.PACTs:
-                                if PACT.current_state=="Sep":
-                                    PACT.update()
+                                    self.PACT.CT.list_of_cells.append(cell)
+
+                    for PACT in self.PACT.CT.PACTs:
+                        if PACT.current_state=="Sep":
+                            PACT.update()
 
     def stopit(self):
         
@@ -2395,14 +2706,7 @@ class CellPicker_apo():
     def __call__(self, event):
         if event.button==3:
             if isinstance(self.PACT.ax, np.ndarray):
-                axshape = self.PACT.ax.shape
-                # Select ax 
-                for i in range(axshape[0]):
-                        for j in range(axshape[1]):
-                                if event.inaxes==self.PACT.ax[i,j]:
-                                    self.PACT.current_subplot = [i,j]
-                                    self.PACT.ax_sel = self.PACT.ax[i,j]
-                                    self.PACT.z = self.PACT.zs[i,j]
+                self.PACT._select_subplot(event)
             else:
                 self.PACT.ax_sel = self.PACT.ax
 
@@ -2411,29 +2715,19 @@ class CellPicker_apo():
             else:
                 x = np.rint(event.xdata).astype(np.int64)
                 y = np.rint(event.ydata).astype(np.int64)
-                picked_point = np.array([x, y])
                 # Check if the point is inside the mask of any cell
-                for i ,mask in enumerate(self.PACT.CT.Masks[self.PACT.t][self.PACT.z]):
-                    for point in mask:
-                        if (picked_point==point).all():
-                            z   = self.PACT.z
-                            lab = self.PACT.CT.Labels[self.PACT.t][z][i]
-                            cell = [lab, self.PACT.t]
-                            idxtopop=[]
-                            pop_cell=False
-                            for jj, _cell in enumerate(self.PACT.list_of_cells):
-                                _lab = _cell[0]
-                                _t   = _cell[1]
-                                if _lab == lab:
-                                    pop_cell=True
-                                    idxtopop.append(jj)
-                            if pop_cell:
-                                idxtopop.sort(reverse=True)
-                                for jj in idxtopop:
-                                    self.PACT.list_of_cells.pop(jj)
-                            else:
-                                self.PACT.list_of_cells.append(cell)
-                            self.PACT.update()
+                i = self.PACT.CT._cell_at(self.PACT.t, self.PACT.z, x, y)
+                if i is not None:
+                    z   = self.PACT.z
+                    lab = self.PACT.CT.Labels[self.PACT.t][z][i]
+                    cell = [lab, self.PACT.t]
+                    # Unselect the cell if it was selected, in a single pass over the list
+                    kept = [_cell for _cell in self.PACT.list_of_cells if _cell[0] != lab]
+                    if len(kept) != len(self.PACT.list_of_cells):
+                        self.PACT.list_of_cells[:] = kept
+                    else:
+                        self.PACT.list_of_cells.append(cell)
+                    self.PACT.update()
     def stopit(self):
         self.canvas.mpl_disconnect(self.cid)
 
@@ -2445,14 +2739,7 @@ class CellPicker_mit():
     def __call__(self, event):
         if event.button==3:
             if isinstance(self.PACT.ax, np.ndarray):
-                axshape = self.PACT.ax.shape
-                # Select ax 
-                for i in range(axshape[0]):
-                        for j in range(axshape[1]):
-                                if event.inaxes==self.PACT.ax[i,j]:
-                                    self.PACT.current_subplot = [i,j]
-                                    self.PACT.ax_sel = self.PACT.ax[i,j]
-                                    self.PACT.z = self.PACT.zs[i,j]
+                self.PACT._select_subplot(event)
             else:
                 self.PACT.ax_sel = self.PACT.ax
 
@@ -2461,39 +2748,28 @@ class CellPicker_mit():
             else:
                 x = np.rint(event.xdata).astype(np.int64)
                 y = np.rint(event.ydata).astype(np.int64)
-                picked_point = np.array([x, y])
                 # Check if the point is inside the mask of any cell
-                for i ,mask in enumerate(self.PACT.CT.Masks[self.PACT.t][self.PACT.z]):
-                    for point in mask:
-                        if (picked_point==point).all():
-                            cont=True
-                            z   = self.PACT.z
-                            lab = self.PACT.CT.Labels[self.PACT.t][z][i]
-                            cell = [lab, self.PACT.t]
-                            if cell not in self.PACT.CT.mito_cells:
-                                if len(self.PACT.CT.mito_cells)==3:
-                                    self.PACT.CT.printfancy("ERROR: Eres un cabezaalberca. cannot select more than 3 cells")
-                                    cont=False
-                                if len(self.PACT.CT.mito_cells)!=0:
-                                    if cell[1]<=self.PACT.CT.mito_cells[0][1]:
-                                        self.PACT.CT.printfancy("ERROR: Desde que altura te caiste de pequeño? Check instructions for mitosis marking")
-                                        cont=False
-                            idxtopop=[]
-                            pop_cell=False
-                            if cont:
-                                for jj, _cell in enumerate(self.PACT.CT.mito_cells):
-                                    _lab = _cell[0]
-                                    _t   = _cell[1]
-                                    if _lab == lab:
-                                        pop_cell=True
-                                        idxtopop.append(jj)
-                                if pop_cell:
-                                    idxtopop.sort(reverse=True)
-                                    for jj in idxtopop:
-                                        self.PACT.CT.mito_cells.pop(jj)
-                                else:
-                                    self.PACT.CT.mito_cells.append(cell)
-                            self.PACT.update()
+                i = self.PACT.CT._cell_at(self.PACT.t, self.PACT.z, x, y)
+                if i is not None:
+                    cont=True
+                    z   = self.PACT.z
+                    lab = self.PACT.CT.Labels[self.PACT.t][z][i]
+                    cell = [lab, self.PACT.t]
+                    if cell not in self.PACT.CT.mito_cells:
+                        if len(self.PACT.CT.mito_cells)==3:
+                            self.PACT.CT.printfancy("ERROR: Eres un cabezaalberca. cannot select more than 3 cells")
+                            cont=False
+                        if len(self.PACT.CT.mito_cells)!=0:
+                            if cell[1]<=self.PACT.CT.mito_cells[0][1]:
+                                self.PACT.CT.printfancy("ERROR: Desde que altura te caiste de pequeño? Check instructions for mitosis marking")
+                                cont=False
+                    if cont:
+                        kept = [_cell for _cell in self.PACT.CT.mito_cells if _cell[0] != lab]
+                        if len(kept) != len(self.PACT.CT.mito_cells):
+                            self.PACT.CT.mito_cells[:] = kept
+                        else:
+                            self.PACT.CT.mito_cells.append(cell)
+                    self.PACT.update()
     def stopit(self):
         self.canvas.mpl_disconnect(self.cid)
 
@@ -2505,14 +2781,7 @@ class CellPicker_CM():
     def __call__(self, event):
         if event.button==3:
             if isinstance(self.PACM.ax, np.ndarray):
-                axshape = self.PACM.ax.shape
-                # Select ax 
-                for i in range(axshape[0]):
-                        for j in range(axshape[1]):
-                                if event.inaxes==self.PACM.ax[i,j]:
-                                    self.PACM.current_subplot = [i,j]
-                                    self.PACM.ax_sel = self.PACM.ax[i,j]
-                                    self.PACM.z = self.PACM.zs[i,j]
+                self.PACM._select_subplot(event)
             else:
                 self.PACM.ax_sel = self.PACM.ax
 
@@ -2521,29 +2790,19 @@ class CellPicker_CM():
             else:
                 x = np.rint(event.xdata).astype(np.int64)
                 y = np.rint(event.ydata).astype(np.int64)
-                picked_point = np.array([x, y])
                 # Check if the point is inside the mask of any cell
-                for i ,mask in enumerate(self.PACM.CT.Masks[self.PACM.t][self.PACM.z]):
-                    for point in mask:
-                        if (picked_point==point).all():
-                            z   = self.PACM.z
-                            lab = self.PACM.CT.Labels[self.PACM.t][z][i]
-                            cell = lab
-                            idxtopop=[]
-                            pop_cell=False
-                            for jj, _cell in enumerate(self.PACM.label_list):
-                                _lab = _cell
-                                if _lab == lab:
-                                    pop_cell=True
-                                    idxtopop.append(jj)
-                            if pop_cell:
-                                idxtopop.sort(reverse=True)
-                                for jj in idxtopop:
-                                    self.PACM.label_list.pop(jj)
-                            else:
-                                self.PACM.label_list.append(cell)
-                            self.PACM.CT.plot_cell_movement(label_list=self.PACM.label_list, plot_mean=self.PACM.plot_mean, plot_tracking=False)
-                            self.PACM.update()
+                i = self.PACM.CT._cell_at(self.PACM.t, self.PACM.z, x, y)
+                if i is not None:
+                    z   = self.PACM.z
+                    lab = self.PACM.CT.Labels[self.PACM.t][z][i]
+                    cell = lab
+                    kept = [_lab for _lab in self.PACM.label_list if _lab != lab]
+                    if len(kept) != len(self.PACM.label_list):
+                        self.PACM.label_list[:] = kept
+                    else:
+                        self.PACM.label_list.append(cell)
+                    self.PACM.CT.plot_cell_movement(label_list=self.PACM.label_list, plot_mean=self.PACM.plot_mean, plot_tracking=False)
+                    self.PACM.update()
     def stopit(self):
         self.canvas.mpl_disconnect(self.cid)
 
@@ -2565,15 +2824,28 @@ class PlotActionCellMovement:
         self.zs=[]
         self.z = None
         self.scl = fig.canvas.mpl_connect('scroll_event', self.onscroll)
+        # Position in the layout of each subplot
+        self._ax_to_idx = {_ax: k for k, _ax in enumerate(np.asarray(ax).ravel())}
+        self.rsz = fig.canvas.mpl_connect('resize_event', self._on_resize)
         groupsize  = self.CT.plot_layout[0] * self.CT.plot_layout[1]
         self.max_round =  math.ceil((self.CT.slices)/(groupsize-self.CT.plot_overlap))-1
         self.get_size()
         self.instructions = self.fig.text(0.2, 0.98, "RIGHT CLICK TO SELECT/UNSELECT CELLS\nTO SHOW ON THE CELL MOVEMENT PLOT", fontsize=1, ha='left', va='top')
         self.plot_mean=True
         self.label_list=list(copy(self.CT.unique_labels))
+        self._set_fontsizes()
         self.update()
         self.CP = CellPicker_CM(self)
 
+    def _select_subplot(self, event):
+        # Select the subplot where the event happened, if any, through the axes table.
+        k = self._ax_to_idx.get(event.inaxes)
+        if k is None:
+            return
+        self.current_subplot = [int(i) for i in np.unravel_index(k, self.ax.shape)]
+        self.ax_sel = self.ax.flat[k]
+        self.z = self.zs.flat[k]
+
     def __call__(self, event):
         if self.current_state==None:
             if event.key=="enter":
@@ -2619,17 +2891,22 @@ class PlotActionCellMovement:
             if self.current_state=="SCL": self.current_state=None
 
     def update(self):
+        import matplotlib.pyplot as plt
+        plt.subplots_adjust(top=0.9,left=0.2)
+        self.fig.canvas.draw_idle()
+        self.CT.fig_cellmovement.canvas.draw_idle()
+
+    def _on_resize(self, event):
+        self._set_fontsizes()
 
+    def _set_fontsizes(self):
+        # Font sizes follow the figure size, so they only need to be set again when the figure is resized
         self.get_size()
         scale=90
         if self.figheight < self.figwidth: width_or_height = self.figheight/scale
         else: width_or_height = self.figwidth/scale
 
         self.instructions.set(fontsize=width_or_height)
-        plt.subplots_adjust(top=0.9,left=0.2)
-        self.fig.canvas.draw_idle()
-        self.CT.fig_cellmovement.canvas.draw()
-        self.fig.canvas.draw()
 
     def get_size(self):
         bboxfig = self.fig.get_window_extent().transformed(self.fig.dpi_scale_trans.inverted())
@@ -0,0 +1,48 @@
+import numpy as np
+import utils
+from CellTracking import CellSegmentation
+
+def assign_labels(ncells, prev_idx, prev_val):
+    # prev_idx[z][cell] and prev_val[z][cell] are the close cells of the previous plane and their distances
+    CS = CellSegmentation.__new__(CellSegmentation)
+    CS.slices   = len(ncells)
+    CS.Outlines = [[None]*n for n in ncells]
+    CS._distances_idx = [[[prev_idx[z][cell], []] for cell in range(n)] for z, n in enumerate(ncells)]
+    CS._distances_val = [[[prev_val[z][cell], []] for cell in range(n)] for z, n in enumerate(ncells)]
+    CS._masks_version = 0
+    CS._assign_labels()
+    return CS.labels
+
+def check_labels(labels):
+    for labs in labels:
+        assert(len(set(labs)) == len(labs))
+    # New labels are max_label+1, so they are never reused and there are no gaps
+    all_labels = set([l for labs in labels for l in labs])
+    assert(all_labels == set(range(len(all_labels))))
+
+# Cell 1 of z=1 is closer than cell 0 to cell 0 of z=0, so cell 0 is moved to a new label.
+# The next new cell of the plane must not get that same label again.
+# Cell 1 of z=2 is further than cell 0 to cell 1 of z=1, so it gets a new label.
+ncells   = [2, 3, 3]
+prev_idx = [[[], []], [[0], [0], []], [[1], [1], [2]]]
+prev_val = [[[], []], [[3.0], [1.0], []], [[2.0], [4.0], [1.0]]]
+labels = assign_labels(ncells, prev_idx, prev_val)
+assert(labels == [[0, 1], [2, 0, 3], [0, 4, 3]])
+check_labels(labels)
+
+# Random planes where several cells compete for the same cell of the previous plane
+rng = np.random.default_rng(0)
+for test in range(200):
+    ncells = rng.integers(0, 8, size=rng.integers(1, 10)).tolist()
+    prev_idx = [[[] for cell in range(n)] for n in ncells]
+    prev_val = [[[] for cell in range(n)] for n in ncells]
+    for z in range(1, len(ncells)):
+        for cell in range(ncells[z]):
+            if ncells[z-1] > 0 and rng.random() < 0.8:
+                # Most of them close to the first two cells
+                k = rng.integers(1, min(3, ncells[z-1])+1)
+                prev_idx[z][cell] = rng.choice(ncells[z-1], size=k, replace=False, p=None if ncells[z-1] < 3 else [0.4, 0.4] + [0.2/(ncells[z-1]-2)]*(ncells[z-1]-2)).tolist()
+                prev_val[z][cell] = rng.uniform(0, 10, size=k).tolist()
+    check_labels(assign_labels(ncells, prev_idx, prev_val))
+
+print("TEST PASSED")
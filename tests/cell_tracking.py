@@ -0,0 +1,29 @@
+import numpy as np
+import utils
+from CellTracking import CellTracking
+
+# Two past cells A and B and a far cell C. Future cells a and b both have B as nearest neighbour,
+# so they compete for it. c is beyond the 7.5 gate of every past cell and d is close to A in xy
+# but too many planes away.
+A, B, C = [5, 0, 0], [5, 0, 6], [5, 50, 50]
+a, b, c, d = [5, 0, 3.5], [5, 0, 8], [5, 30, 30], [9, 0, 1]
+CT = CellTracking.__new__(CellTracking)
+CT.times         = 2
+CT._xyresolution = 1.0
+CT._Dists_buf    = np.empty(64*64, dtype=np.float32)
+CT.TLabels   = [[0, 1, 2], [0, 1, 2, 3]]
+CT.TCenters  = [np.array([A, B, C], dtype=np.float32), np.array([c, b, a, d], dtype=np.float32)]
+CT.TOutlines = [["A", "B", "C"], ["c", "b", "a", "d"]]
+CT.label_correspondance = [[], []]
+CT.cell_tracking()
+
+# Both A and B are matched instead of only the mutual nearest neighbours B and b
+assert(CT.FinalLabels[1] == [0, 1, 3, 4])
+assert(CT.FinalOutlines[1] == ["a", "b", "c", "d"])
+assert((CT.FinalCenters[1] == np.array([a, b, c, d], dtype=np.float32)).all())
+assert(CT.label_correspondance[0].tolist() == [[0, 0], [1, 1], [2, 2]])
+assert(CT.label_correspondance[1].tolist() == [[2, 0], [1, 1], [0, 3], [3, 4]])
+# c and d are not matched to any past cell, they get new labels
+assert(not set(CT.FinalLabels[1][2:]) & set(CT.FinalLabels[0]))
+
+print("TEST PASSED")
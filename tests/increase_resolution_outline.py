@@ -62,6 +62,23 @@ outline_new = increase_point_resolution(rounds, outline)
 newoutline, usedidxs = sort_point_sequence(outline)
 newoutline_new = increase_point_resolution(rounds, newoutline)
 
+# The vectorized version used in CellTracking has to give the same outlines
+import utils
+from CellTracking import increase_point_resolution as increase_point_resolution_ct
+assert((increase_point_resolution_ct(outline, 150) == outline_new).all())
+assert((increase_point_resolution_ct(newoutline, 150) == newoutline_new).all())
+rng = np.random.default_rng(0)
+for i in range(20):
+    _outline = rng.integers(0, 500, size=(rng.integers(3, 100), 2)).astype('int32')
+    for min_outline_length in [50, 150, 200, 1000]:
+        _rounds = np.ceil(np.log2(min_outline_length/len(_outline))).astype('int32')
+        _new = increase_point_resolution_ct(_outline, min_outline_length)
+        # Outlines that are long enough are left as they are
+        _old = increase_point_resolution(_rounds, _outline) if _rounds > 0 else _outline
+        assert(_new.shape == _old.shape)
+        assert((_new == _old).all())
+print("TEST PASSED")
+
 fig1, ax = plt.subplots(1,2, figsize=(10,5))
 ax[0].scatter(outline[:,0], outline[:,1],s=100, label="unsorted original")
 for id, point in enumerate(outline):
@@ -0,0 +1,32 @@
+import numpy as np
+from utils import circle
+from CellTracking import mask_bitmap, bitmaps_intersection_size, _popcount, points_within_hull
+
+def intersection_size_sets(m1, m2):
+    return len(set(map(tuple, m1.tolist())) & set(map(tuple, m2.tolist())))
+
+rng = np.random.default_rng(0)
+masks = []
+# Masks around the 64 pixel word boundaries, starting and ending on both sides of them
+for cx in [63, 64, 127, 128, 191, 200]:
+    for r in [2, 5, 31, 33, 70]:
+        masks.append(points_within_hull(circle(cx+r, 100, r, 80)))
+        masks.append(points_within_hull(circle(cx, 100 + rng.integers(-10, 10), r, 80)))
+# Single pixels and single columns at the word edges
+for x in [0, 63, 64, 127, 128]:
+    masks.append(np.array([[x, 100]], dtype='int32'))
+    masks.append(np.array([[x, y] for y in range(90, 110)], dtype='int32'))
+# Random scattered masks
+for i in range(20):
+    masks.append(np.unique(rng.integers(0, 300, size=(rng.integers(1, 500), 2)), axis=0).astype('int32'))
+
+bitmaps = [mask_bitmap(mask) for mask in masks]
+for mask, bitmap in zip(masks, bitmaps):
+    assert(bitmap[3] == len(mask))
+    assert(_popcount(bitmap[2]) == len(mask))
+
+for i in range(len(masks)):
+    for j in range(len(masks)):
+        assert(bitmaps_intersection_size(bitmaps[i], bitmaps[j]) == intersection_size_sets(masks[i], masks[j]))
+
+print("TEST PASSED")
@@ -0,0 +1,78 @@
+import numpy as np
+import utils
+from CellTracking import _merge_cell_barriers
+
+# Cell barrier merging and filtering as it was done before the Numba kernel
+def merge_cell_barriers_old(intensity, datavalleys_idx, datapeaks_idx, th):
+    cellbarriers = []
+    for idx in datavalleys_idx:
+        if idx==0: continue
+        if idx==len(intensity)-1: continue
+        cellbarriers.append(idx)
+
+    keep_checking = True
+    while keep_checking:
+        keep_checking=False
+        cellbarriers_to_pop = []
+        cellbarriers_to_add = []
+        for i, cb in enumerate(cellbarriers[0:-1]):
+            dif = cellbarriers[i+1] - cb
+            if dif < 5:
+                if i not in cellbarriers_to_pop: cellbarriers_to_pop.append(i)
+                if i+1 not in cellbarriers_to_pop: cellbarriers_to_pop.append(i+1)
+                new_cb = np.argmax(intensity[cb:cellbarriers[i+1]]) + cb
+                cellbarriers_to_add.append(new_cb)
+                intensity[cb:cellbarriers[i+1]+1] = np.ones(len(intensity[cb:cellbarriers[i+1]+1]))*intensity[new_cb]
+                keep_checking=True
+        cellbarriers_to_pop.reverse()
+        for i in cellbarriers_to_pop:
+            cellbarriers.pop(i)
+        for new_cb in cellbarriers_to_add:
+            cellbarriers.append(new_cb)
+        cellbarriers.sort()
+
+    cellbarriers_to_pop = []
+    for i, cb in enumerate(cellbarriers):
+        closest_peak_right_idx = datapeaks_idx[datapeaks_idx > cb].min()
+        closest_peak_left_idx  = datapeaks_idx[datapeaks_idx < cb].max()
+        inten_peak = np.minimum(intensity[closest_peak_left_idx], intensity[closest_peak_right_idx])
+        if (inten_peak - intensity[cb])/inten_peak < th:
+            cellbarriers_to_pop.append(i)
+    cellbarriers_to_pop.reverse()
+    for i in cellbarriers_to_pop:
+        cellbarriers.pop(i)
+    return cellbarriers
+
+rng = np.random.default_rng(0)
+ncompared = 0
+for test in range(2000):
+    # Noisy bumps, giving close valleys to merge as well as isolated ones
+    nz = rng.integers(3, 60)
+    z  = np.arange(nz)
+    intensity = np.zeros(nz)
+    for bump in range(rng.integers(1, 5)):
+        intensity += rng.uniform(1, 10)*np.exp(-(z - rng.uniform(0, nz))**2/(2*rng.uniform(1, 8)**2))
+    intensity += rng.uniform(0, rng.choice([0.01, 0.5, 2]), size=nz)
+    th = rng.choice([0.0, 0.1, 0.2, 0.5])
+
+    datavalleys = np.r_[True, intensity[1:] < intensity[:-1]] & np.r_[intensity[:-1] < intensity[1:], True]
+    datavalleys_idx = np.arange(0,len(datavalleys))[datavalleys]
+    datapeaks = np.r_[True, intensity[1:] > intensity[:-1]] & np.r_[intensity[:-1] > intensity[1:], True]
+    datapeaks_idx = np.arange(0,len(datapeaks))[datapeaks]
+
+    intensity_old = intensity.copy()
+    try:
+        old = merge_cell_barriers_old(intensity_old, datavalleys_idx, datapeaks_idx, th)
+    except ValueError:
+        # The old code fails when a barrier has no peak at one of its sides
+        continue
+
+    intensity_new = intensity.copy()
+    valleys = datavalleys_idx[(datavalleys_idx>0) & (datavalleys_idx<len(datavalleys)-1)]
+    new = _merge_cell_barriers(intensity_new, valleys, datapeaks_idx, th)
+    assert(new.tolist() == old)
+    assert((intensity_new == intensity_old).all())
+    ncompared += 1
+
+assert(ncompared > 1000)
+print("TEST PASSED")
@@ -0,0 +1,85 @@
+import numpy as np
+from utils import circle
+from CellTracking import CellSegmentation, points_within_hull
+
+# Overlap measure as it was computed before, from the full matrix of plane overlaps
+def compute_overlap_old(m1, m2, relative):
+    nrows, ncols = m1.shape
+    dtype={'names':['f{}'.format(i) for i in range(ncols)],
+        'formats':ncols * [m1.dtype]}
+    C = np.intersect1d(m1.view(dtype), m2.view(dtype))
+    cl = C.view(m1.dtype).reshape(-1, ncols)
+    if relative:
+        denominador = np.minimum(len(m1), len(m2))
+        return 100*len(cl)/denominador
+    else:
+        denominador = np.add(len(m1), len(m2))
+        return 200*len(cl)/denominador
+
+def compute_overlap_measure_old(labels, Masks, Zlabel_l, Zlabel_z, relative, fullmat, zneigh):
+    Zoverlaps = []
+    for c in range(len(Zlabel_l)):
+        lab = Zlabel_l[c]
+        Zoverlaps.append(np.zeros((len(Zlabel_z[c]), len(Zlabel_z[c]))))
+        for i, z in enumerate(Zlabel_z[c]):
+            mask_curr = Masks[z][labels[z].index(lab)]
+            if fullmat:
+                zvec = Zlabel_z[c]
+            else:
+                zvec = Zlabel_z[c][0:i]
+            for j, zz in enumerate(zvec):
+                if zz!=z:
+                    mask_other = Masks[zz][labels[zz].index(lab)]
+                    Zoverlaps[c][i,j] = compute_overlap_old(mask_curr, mask_other, relative)
+    Zoverlaps_conv = []
+    for c, Zoverlap in enumerate(Zoverlaps):
+        Zoverlaps_conv.append([])
+        for z in range(Zoverlap.shape[0]):
+            val = 0.0
+            n   = 0
+            for i in range(np.maximum(z-zneigh, 0), np.minimum(z+zneigh+1, Zoverlap.shape[0])):
+                if i!=z:
+                    val+=Zoverlap[z, i]
+                    n+=1
+            if n == 0:
+                Zoverlaps_conv[-1].append(0.0)
+            else:
+                Zoverlaps_conv[-1].append(val/n)
+    return Zoverlaps_conv
+
+# Cells spanning a few consecutive planes, drifting and changing size between them
+rng = np.random.default_rng(0)
+slices = 12
+labels = [[] for z in range(slices)]
+Masks  = [[] for z in range(slices)]
+for lab in range(25):
+    z0 = rng.integers(0, slices)
+    z1 = min(slices, z0 + rng.integers(1, 8))
+    cx, cy = rng.integers(40, 460, size=2)
+    for z in range(z0, z1):
+        cx += rng.integers(-4, 5)
+        cy += rng.integers(-4, 5)
+        labels[z].append(lab)
+        Masks[z].append(points_within_hull(circle(cx, cy, rng.integers(5, 30))))
+
+for relative in [True, False]:
+    for fullmat in [True, False]:
+        for zneigh in [1, 2, 3]:
+            CS = CellSegmentation.__new__(CellSegmentation)
+            CS.slices   = slices
+            CS.labels   = labels
+            CS.Masks    = Masks
+            CS._relative = relative
+            CS._fullmat  = fullmat
+            CS._zneigh   = zneigh
+            CS._label_per_z_dirty = True
+            CS._label_per_z()
+            CS._compute_mask_bitmaps()
+            CS._compute_overlap_measure()
+
+            old = compute_overlap_measure_old(labels, Masks, CS._Zlabel_l, CS._Zlabel_z, relative, fullmat, zneigh)
+            assert(len(CS._Zoverlaps_conv) == len(old))
+            for new_c, old_c in zip(CS._Zoverlaps_conv, old):
+                assert(np.allclose(new_c, old_c))
+
+print("TEST PASSED")
@@ -0,0 +1,25 @@
+import numpy as np
+from utils import points_within_hull_old, circle
+from CellTracking import points_within_hull
+
+rng = np.random.default_rng(0)
+hulls = [
+    circle(50, 50, 10, 40),
+    circle(200, 120, 25, 150),
+    circle(64, 300, 3, 12),
+    np.array([[347, 236], [343, 242], [348, 255], [361, 257], [364, 248],
+              [360, 237], [354, 256], [354, 235], [352, 237], [346, 242]], dtype='int32'),
+    np.array([[10, 10], [20, 10]], dtype='int32'),
+    np.array([[10, 10], [20, 11]], dtype='int32'),
+]
+# Unsorted random outlines, with several points per row and rows without points
+for i in range(20):
+    hulls.append(rng.integers(0, 500, size=(rng.integers(2, 60), 2)).astype('int32'))
+
+for hull in hulls:
+    old = points_within_hull_old(hull).reshape(-1, 2)
+    new = points_within_hull(hull)
+    assert(new.shape == old.shape)
+    assert((new == old).all())
+
+print("TEST PASSED")
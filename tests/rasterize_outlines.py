@@ -0,0 +1,30 @@
+import numpy as np
+from utils import points_within_hull_old, circle
+from CellTracking import points_within_hulls, _rasterize_outlines
+
+rng = np.random.default_rng(1)
+
+# A z-plane with many cells, some of them overlapping, and one giving an empty mask
+hulls = [circle(rng.integers(30, 470), rng.integers(30, 470), rng.integers(3, 30), rng.integers(8, 200)) for i in range(50)]
+hulls.append(np.array([[10, 10], [20, 10]], dtype='int32'))
+for i in range(20):
+    hulls.append(rng.integers(0, 500, size=(rng.integers(2, 60), 2)).astype('int32'))
+
+masks = points_within_hulls(hulls)
+assert(len(masks) == len(hulls))
+for hull, mask in zip(hulls, masks):
+    old = points_within_hull_old(hull).reshape(-1, 2)
+    assert(mask.shape == old.shape)
+    assert((mask == old).all())
+
+# The points of all the outlines are returned one after the other
+offsets = np.zeros(len(hulls)+1, dtype=np.int64)
+offsets[1:] = np.cumsum([len(hull) for hull in hulls])
+points, starts = _rasterize_outlines(np.concatenate(hulls).astype(np.int64), offsets)
+assert(starts[0] == 0 and starts[-1] == len(points))
+assert((np.diff(starts) == [len(mask) for mask in masks]).all())
+assert((points == np.concatenate(masks)).all())
+
+assert(points_within_hulls([]) == [])
+
+print("TEST PASSED")
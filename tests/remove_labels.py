@@ -0,0 +1,49 @@
+import numpy as np
+from copy import deepcopy
+import utils
+from CellTracking import CellSegmentation
+
+# Removal as it was done before, popping the cells one by one
+def remove_labels_old(labels, Outlines, Masks, labels_to_remove):
+    for z, labs in enumerate(labels):
+        for l in labels_to_remove:
+            if l in labs:
+                id_l=labs.index(l)
+                labels[z].pop(id_l)
+                Outlines[z].pop(id_l)
+                Masks[z].pop(id_l)
+
+rng = np.random.default_rng(0)
+for test in range(50):
+    slices = rng.integers(1, 10)
+    labels   = [rng.permutation(40)[:rng.integers(0, 20)].tolist() for z in range(slices)]
+    Outlines = [[rng.integers(0, 500, size=(rng.integers(2, 10), 2)) for l in labs] for labs in labels]
+    Masks    = [[rng.integers(0, 500, size=(rng.integers(1, 30), 2)) for l in labs] for labs in labels]
+    labels_to_remove = rng.permutation(45)[:rng.integers(0, 30)].tolist()
+
+    CS = CellSegmentation.__new__(CellSegmentation)
+    CS.labels   = deepcopy(labels)
+    CS.Outlines = deepcopy(Outlines)
+    CS.Masks    = deepcopy(Masks)
+    CS._masks_version = 0
+    # Only the z-levels where some of the labels are present
+    removals_by_z = {}
+    for z, labs in enumerate(labels):
+        for l in labels_to_remove:
+            if l in labs:
+                removals_by_z.setdefault(z, set()).add(l)
+    CS._remove_labels(removals_by_z)
+
+    remove_labels_old(labels, Outlines, Masks, labels_to_remove)
+    assert(CS.labels == labels)
+    for z in range(slices):
+        assert(len(CS.Outlines[z]) == len(Outlines[z]))
+        assert(len(CS.Masks[z]) == len(Masks[z]))
+        for o_new, o_old in zip(CS.Outlines[z], Outlines[z]):
+            assert(o_new.shape == o_old.shape and (o_new == o_old).all())
+        for m_new, m_old in zip(CS.Masks[z], Masks[z]):
+            assert(m_new.shape == m_old.shape and (m_new == m_old).all())
+    assert(CS._label_per_z_dirty)
+    assert(CS._masks_version == 1)
+
+print("TEST PASSED")
@@ -0,0 +1,37 @@
+import sys, os
+import numpy as np
+
+# Tests are run as scripts from tests/, importing this module makes CellTracking importable
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Scanline fill of a single outline as it was done before the Numba kernels
+def points_within_hull_old(hull):
+    pointsinside=[]
+    sortidx = np.argsort(hull[:,1])
+    outx = hull[:,0][sortidx]
+    outy = hull[:,1][sortidx]
+    curry = outy[0]
+    minx = np.iinfo(np.int32).max
+    maxx = 0
+    for j,y in enumerate(outy):
+        done=False
+        while not done:
+            if y==curry:
+                minx = np.minimum(minx, outx[j])
+                maxx = np.maximum(maxx, outx[j])
+                done=True
+                curry=y
+            else:
+                for x in range(minx, maxx+1):
+                    pointsinside.append([x, curry])
+                minx = np.iinfo(np.int32).max
+                maxx = 0
+                curry= y
+
+    pointsinside=np.array(pointsinside)
+    return pointsinside
+
+# Outline of a circle of radius r centered at (cx, cy), rounded to pixels
+def circle(cx, cy, r, npoints=60):
+    angles = np.linspace(0, 2*np.pi, npoints, endpoint=False)
+    return np.rint(np.column_stack([cx + r*np.cos(angles), cy + r*np.sin(angles)])).astype('int32')
@@ -1,5 +1,4 @@
 import numpy as np
-import matplotlib.pyplot as plt
 import pickle
 
 def compute_distance_xy(X1, X2, Y1, Y2):